@@ -0,0 +1,121 @@
+# app/account_stats.py
+
+import logging
+
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Account, AccountStats, Like, Tweet
+
+COUNTERS = ("tweet_count", "likes_received", "followers")
+
+# INSERT ... ON CONFLICT per supported backend
+_UPSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# ─── computing from scratch ──────────────────────────────────────────────────
+def _tweet_counts(account_ids=None):
+    q = select(Tweet.user_id, func.count()).group_by(Tweet.user_id)
+    return q if account_ids is None else q.where(Tweet.user_id.in_(account_ids))
+
+def _like_counts(account_ids=None):
+    q = (
+        select(Tweet.user_id, func.count())
+        .select_from(Like)
+        .join(Tweet, Tweet.id == Like.tweet_id)
+        .group_by(Tweet.user_id)
+    )
+    return q if account_ids is None else q.where(Tweet.user_id.in_(account_ids))
+
+def count_from_scratch(conn, account_ids=None) -> dict[int, dict]:
+    """
+    {account_id: counters} computed with aggregates. Only used to seed
+    missing rows and to reconcile, never on a profile view.
+    """
+    ids = None if account_ids is None else list(account_ids)
+    counts = {i: dict.fromkeys(COUNTERS, 0) for i in ids or ()}
+    for column, q in (("tweet_count", _tweet_counts(ids)), ("likes_received", _like_counts(ids))):
+        for account_id, n in conn.execute(q):
+            counts.setdefault(account_id, dict.fromkeys(COUNTERS, 0))[column] = n
+    return counts
+
+# ─── incremental maintenance ─────────────────────────────────────────────────
+def _bump(conn, account_id, **deltas) -> None:
+    """
+    Apply counter deltas in the writing transaction. An account without a
+    row yet (it predates the counters) is seeded from aggregates once; if a
+    concurrent first write seeds it first, the deltas land on that row.
+    """
+    if account_id is None:
+        return
+    increments = {k: getattr(AccountStats, k) + v for k, v in deltas.items()}
+    result = conn.execute(
+        update(AccountStats).where(AccountStats.account_id == account_id).values(increments)
+    )
+    if result.rowcount == 0:
+        # the flush being handled is already visible to these counts
+        seeded = count_from_scratch(conn, [account_id])[account_id]
+        conn.execute(
+            _UPSERT[conn.dialect.name](AccountStats)
+            .values(account_id=account_id, **seeded)
+            .on_conflict_do_update(index_elements=[AccountStats.account_id], set_=increments)
+        )
+
+def _author_of(conn, tweet_id):
+    return conn.execute(select(Tweet.user_id).where(Tweet.id == tweet_id)).scalar()
+
+@event.listens_for(Account, "after_insert")
+def _account_created(mapper, conn, target):
+    conn.execute(insert(AccountStats).values(account_id=target.id))
+
+@event.listens_for(Tweet, "after_insert")
+def _tweet_created(mapper, conn, target):
+    _bump(conn, target.user_id, tweet_count=1)
+
+@event.listens_for(Tweet, "after_delete")
+def _tweet_deleted(mapper, conn, target):
+    _bump(conn, target.user_id, tweet_count=-1)
+
+@event.listens_for(Like, "after_insert")
+def _like_created(mapper, conn, target):
+    _bump(conn, _author_of(conn, target.tweet_id), likes_received=1)
+
+@event.listens_for(Like, "after_delete")
+def _like_deleted(mapper, conn, target):
+    _bump(conn, _author_of(conn, target.tweet_id), likes_received=-1)
+
+# ─── reads & repair ──────────────────────────────────────────────────────────
+def get_stats(db: Session, account_id: int) -> dict:
+    """
+    Counters for one profile: a primary-key read. Accounts that haven't
+    written since the counters were introduced are counted on the fly
+    (read sessions can't seed the row; the next write or reconcile does).
+    """
+    row = db.get(AccountStats, account_id)
+    if row is not None:
+        return {k: getattr(row, k) for k in COUNTERS}
+    return count_from_scratch(db.connection(), [account_id])[account_id]
+
+def reconcile(db: Session) -> int:
+    """
+    Recompute every account's counters and fix the rows that drifted,
+    e.g. after bulk deletes (archival) that bypass the ORM events.
+    Returns the number of rows inserted or corrected.
+    """
+    truth = count_from_scratch(db.connection())
+    stored = {row.account_id: row for row in db.query(AccountStats)}
+    fixed = 0
+    for (account_id,) in db.execute(select(Account.id)).all():
+        counts = truth.get(account_id) or dict.fromkeys(COUNTERS, 0)
+        row = stored.get(account_id)
+        if row is None:
+            db.add(AccountStats(account_id=account_id, **counts))
+        elif any(getattr(row, k) != v for k, v in counts.items() if k != "followers"):
+            row.tweet_count, row.likes_received = counts["tweet_count"], counts["likes_received"]
+        else:
+            continue
+        fixed += 1
+    db.commit()
+    if fixed:
+        logging.info(f"Reconciled profile counters of {fixed} accounts")
+    return fixed
@@ -0,0 +1,150 @@
+# app/archiver.py
+
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Iterable
+
+from sqlalchemy import insert, select, text
+
+from app.database import SessionLocal, engine
+from app.export import EXPORTERS
+from app.models import Like, Tweet, TweetArchive, TWEETS_PARTITIONED
+from app.partitions import list_tweet_partitions, partition_bounds
+from app.utils.settings import settings
+
+class TweetArchiver:
+    """
+    Moves tweets older than the retention window out of the live table,
+    either into tweets_archive or into gzip-compressed NDJSON segments.
+    On partitioned Postgres, whole months past the cutoff are copied and
+    their partition dropped; whatever is left is moved row-wise in batches.
+    """
+
+    def __init__(self, retention_days: int, mode: str = "table", directory: str = "archive",
+                 interval: int = 3600, batch_size: int = 1000):
+        # tweets older than this are considered cold
+        self.retention = timedelta(days=retention_days)
+        # "table" or "ndjson"
+        self.mode = mode
+        # destination of NDJSON segments
+        self.directory = directory
+        # seconds between archive passes (run by the scheduler)
+        self.interval = interval
+        # rows moved per transaction in the row-wise path
+        self.batch_size = batch_size
+
+    def run_once(self, still_leader: Callable[[], bool] = lambda: True) -> int:
+        """
+        Run one archive pass. Returns the number of tweets moved.
+        Blocking DB work; the scheduler runs it in a thread on the leader.
+        Each batch is its own transaction, so nothing is left half-moved.
+        A pass can outlast the leader lease, so `still_leader` is checked
+        before every batch or partition and the pass stops once it's false.
+        """
+        cutoff = datetime.now(timezone.utc) - self.retention
+        moved = 0
+        if TWEETS_PARTITIONED:
+            moved += self._archive_partitions(cutoff, still_leader)
+        moved += self._archive_rows(cutoff, still_leader)
+        if moved:
+            logging.info(f"Archived {moved} tweets older than {cutoff.isoformat()}")
+        return moved
+
+    # ─── destinations ────────────────────────────────────────────────────────
+    def _write_segment(self, rows: Iterable[dict], label: str) -> int:
+        """
+        Stream rows into `<label>.ndjson.gz` and fsync it before the caller
+        deletes the source rows. Returns the number of rows written.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        count = 0
+        with open(os.path.join(self.directory, f"{label}.ndjson.gz"), "wb") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                for r in rows:
+                    gz.write((json.dumps(r, separators=(",", ":")) + "\n").encode("utf-8"))
+                    count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        return count
+
+    # ─── row-wise path ───────────────────────────────────────────────────────
+    def _archive_rows(self, cutoff: datetime, still_leader: Callable[[], bool]) -> int:
+        serialize = EXPORTERS["tweets"][1]
+        moved = 0
+        while True:
+            if not still_leader():
+                logging.warning(f"Lost scheduler leadership; archive pass stopped after {moved} tweets")
+                return moved
+            session = SessionLocal()
+            try:
+                batch = session.scalars(
+                    select(Tweet)
+                    .where(Tweet.created_at < cutoff)
+                    .order_by(Tweet.id)
+                    .limit(self.batch_size)
+                ).all()
+                if not batch:
+                    return moved
+                ids = [t.id for t in batch]
+                if self.mode == "ndjson":
+                    self._write_segment(map(serialize, batch), f"tweets-{ids[0]}-{ids[-1]}")
+                else:
+                    session.execute(insert(TweetArchive), [
+                        {"id": t.id, "content": t.content, "user_id": t.user_id, "created_at": t.created_at}
+                        for t in batch
+                    ])
+                session.query(Like).filter(Like.tweet_id.in_(ids)).delete(synchronize_session=False)
+                session.query(Tweet).filter(Tweet.id.in_(ids)).delete(synchronize_session=False)
+                session.commit()
+                moved += len(ids)
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+    # ─── partition path (Postgres) ───────────────────────────────────────────
+    def _archive_partitions(self, cutoff: datetime, still_leader: Callable[[], bool]) -> int:
+        moved = 0
+        with engine.connect() as conn:
+            names = list_tweet_partitions(conn)
+        for name in names:
+            _, end = partition_bounds(name)
+            if end > cutoff.date():
+                break
+            if not still_leader():
+                logging.warning(f"Lost scheduler leadership; partition archival stopped before {name}")
+                break
+            moved += self._archive_partition(name, end)
+        return moved
+
+    def _archive_partition(self, name: str, end: date) -> int:
+        with engine.begin() as conn:
+            if self.mode == "ndjson":
+                result = conn.execution_options(stream_results=True, yield_per=self.batch_size).execute(text(
+                    f"SELECT id, content, user_id, created_at FROM {name} ORDER BY id"
+                )).mappings()
+                count = self._write_segment(
+                    ({**r, "created_at": r["created_at"].isoformat()} for r in result), name
+                )
+            else:
+                count = conn.execute(text(
+                    f"INSERT INTO tweets_archive (id, content, user_id, created_at) "
+                    f"SELECT id, content, user_id, created_at FROM {name} "
+                    f"ON CONFLICT (id) DO NOTHING"
+                )).rowcount
+            conn.execute(text(f"DELETE FROM likes WHERE tweet_id IN (SELECT id FROM {name})"))
+            conn.execute(text(f"ALTER TABLE tweets DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+        logging.info(f"Archived and dropped partition {name} (< {end.isoformat()})")
+        return count
+
+# singleton; started on app startup when TWEET_RETENTION_DAYS > 0
+archiver = TweetArchiver(
+    retention_days=settings.tweet_retention_days,
+    mode=settings.tweet_archive_mode,
+    directory=settings.tweet_archive_dir,
+)
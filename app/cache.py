@@ -1,76 +1,167 @@
 import redis.asyncio as aioredis               # use asyncio client from redis-py
+from app import tweet_codec
+from app.cache_backends import CacheBackend, MemoryBackend, RedisBackend
 from app.utils.settings import settings       # load Redis URL and other configs
 
-# Global Redis client reference
+# Active cache backend (Redis or embedded), set by init_cache()
+backend: CacheBackend | None = None
+# Raw Redis client, only when the Redis backend is active (for Lua scripts)
 redis_client: aioredis.Redis | None = None
 
 async def init_cache():
     """
-    Initialize the Redis connection pool using redis.asyncio.
+    Select and initialize the cache backend.
+    CACHE_BACKEND=redis uses a redis.asyncio connection pool; memory keeps
+    everything in-process (single node, tests, benchmarks).
     Called on application startup before handling requests.
     """
-    global redis_client
-    redis_client = aioredis.from_url(
-        settings.redis_url,
-        encoding="utf-8",
-        decode_responses=True,
-    )
+    global backend, redis_client
+    if settings.cache_backend == "redis":
+        redis_client = aioredis.from_url(
+            settings.redis_url,
+            encoding="utf-8",
+            decode_responses=True,
+        )
+        backend = RedisBackend(redis_client)
+    else:
+        redis_client = None
+        backend = MemoryBackend()
 
 async def close_cache():
     """
-    Close the Redis connection pool on shutdown to free resources.
+    Close the cache backend on shutdown to free resources.
     """
-    if redis_client:
-        await redis_client.close()
+    global backend, redis_client
+    if backend:
+        await backend.close()
+    backend = None
+    redis_client = None
+
+def _tweet_key(tweet_id: int) -> str:
+    # legacy hash layout; also the member name in tweets:recent
+    return f"tweet:{tweet_id}"
+
+def _blob_key(tweet_id: int) -> str:
+    # compact layout (see tweet_codec)
+    return f"tweet:{tweet_id}:bin"
+
+# pre-rendered head of the global timeline, shared by the workers
+TIMELINE_HEAD_KEY = "timeline:head"
 
 async def get_tweet_cache(tweet_id: int) -> dict | None:
     """
     Retrieve a cached tweet by its ID.
     Returns a dict of tweet fields if present, else None.
     """
-    key = f"tweet:{tweet_id}"
-    data = await redis_client.hgetall(key)
-    if not data:
-        return None
-    return data
+    return (await get_tweets_cache([tweet_id])).get(tweet_id)
+
+async def get_tweets_cache(tweet_ids) -> dict[int, dict]:
+    """
+    Retrieve several cached tweets: {id: fields} for the ones present.
+    Compact entries come back in one MGET; ids that miss are looked up in
+    the legacy hash layout in one more pipelined round trip, so entries
+    written before the switch (or by workers still writing hashes) are read.
+    """
+    ids = list(dict.fromkeys(tweet_ids))
+    if not ids:
+        return {}
+    found, missing = {}, []
+    blobs = await backend.mget_bytes(*(_blob_key(i) for i in ids))
+    for tweet_id, blob in zip(ids, blobs):
+        tweet = tweet_codec.decode_tweet(blob)
+        if tweet is None:
+            missing.append(tweet_id)
+        else:
+            found[tweet_id] = tweet
+    if missing:
+        async with backend.pipeline(transaction=False) as pipe:
+            for tweet_id in missing:
+                pipe.hgetall(_tweet_key(tweet_id))
+            rows = await pipe.execute()
+        for tweet_id, data in zip(missing, rows):
+            tweet = tweet_codec.from_hash(data)
+            if tweet is not None:
+                found[tweet_id] = tweet
+    return found
 
 async def set_tweet_cache(tweet) -> None:
     """
-    Cache a Tweet object in Redis and add it to the recent-sorted set.
+    Cache a Tweet object and add it to the recent-sorted set.
     Called after creating or updating a tweet in the database.
     """
-    key = f"tweet:{tweet.id}"
-    await redis_client.hset(
-        key,
-        mapping={
-            "id": str(tweet.id),
-            "content": tweet.content,
-            "created_at": tweet.created_at.isoformat(),
-            "updated_at": tweet.updated_at.isoformat(),
-            "account_id": str(tweet.account_id),
-        },
-    )
-    score = tweet.created_at.timestamp()
-    await redis_client.zadd("tweets:recent", {key: score})
+    await set_tweets_cache([tweet], recent=True)
+
+async def set_tweets_cache(tweets, recent: bool = False) -> None:
+    """
+    Cache several tweets (ORM objects or rows) in one pipelined round trip.
+    TWEET_CACHE_FORMAT=hash keeps writing the legacy layout, for rolling
+    out readers before writers; each write removes the other layout's copy.
+    Only `recent` writes (new or edited tweets, the newest on warm-up) go
+    into tweets:recent, which is trimmed to RECENT_TWEETS_CACHE_SIZE;
+    back-filling misses by id must not make old tweets look recent.
+    """
+    ttl = settings.tweet_cache_ttl_seconds
+    async with backend.pipeline(transaction=False) as pipe:
+        for tweet in tweets:
+            key = _tweet_key(tweet.id)
+            if settings.tweet_cache_format == "hash":
+                pipe.delete(_blob_key(tweet.id))
+                pipe.hset(
+                    key,
+                    mapping={
+                        "id": str(tweet.id),
+                        "content": tweet.content,
+                        "created_at": tweet.created_at.isoformat(),
+                        "user_id": str(tweet.user_id),
+                    },
+                )
+                pipe.expire(key, ttl)
+            else:
+                pipe.set(_blob_key(tweet.id), tweet_codec.encode_tweet(tweet), ex=ttl)
+                pipe.delete(key)
+            if recent:
+                pipe.zadd("tweets:recent", {key: tweet.created_at.timestamp()})
+        if recent:
+            # keep the newest N: drop everything ranked below them
+            pipe.zremrangebyrank("tweets:recent", 0, -(settings.recent_tweets_cache_size + 1))
+        await pipe.execute()
 
 async def invalidate_tweet_cache(tweet_id: int) -> None:
     """
     Remove a tweet from the cache and the recent-sorted set.
     Called after deleting a tweet in the database.
     """
-    key = f"tweet:{tweet_id}"
-    await redis_client.delete(key)
-    await redis_client.zrem("tweets:recent", key)
+    key = _tweet_key(tweet_id)
+    await backend.delete(key, _blob_key(tweet_id))
+    await backend.zrem("tweets:recent", key)
 
 async def get_recent_tweets(skip: int = 0, limit: int = 100) -> list[dict]:
     """
     Retrieve a paginated list of recent tweets from the cache.
     Falls back to DB if cache is empty (to be handled in router).
     """
-    keys = await redis_client.zrevrange("tweets:recent", skip, skip + limit - 1)
-    tweets = []
-    for key in keys:
-        data = await redis_client.hgetall(key)
-        if data:
-            tweets.append(data)
-    return tweets
+    keys = await backend.zrevrange("tweets:recent", skip, skip + limit - 1)
+    if not keys:
+        return []
+    ids = [int(key.split(":")[1]) for key in keys]
+    found = await get_tweets_cache(ids)
+    return [found[i] for i in ids if i in found]
+
+# ─── timeline head ───────────────────────────────────────────────────────────
+async def get_timeline_head() -> list[tuple[int, bytes]] | None:
+    """
+    The shared snapshot of the newest rendered tweets, or None.
+    """
+    (blob,) = await backend.mget_bytes(TIMELINE_HEAD_KEY)
+    return tweet_codec.decode_page(blob)
+
+async def set_timeline_head(entries: list[tuple[int, bytes]]) -> None:
+    """
+    Publish a worker's freshly primed timeline head for the others.
+    """
+    await backend.set(
+        TIMELINE_HEAD_KEY, tweet_codec.encode_page(entries), ex=settings.timeline_head_ttl_seconds
+    )
+
+async def invalidate_timeline_head() -> None:
+    await backend.delete(TIMELINE_HEAD_KEY)
@@ -0,0 +1,615 @@
+# app/cache_backends.py
+
+import asyncio
+import hashlib
+import heapq
+import math
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import AsyncIterator
+
+class CacheBackend(ABC):
+    """
+    The subset of Redis the app relies on: strings, hashes, sorted sets,
+    HyperLogLogs, TTLs, pipelines and pub/sub. Values and members come back
+    as str, as with a Redis client created with decode_responses=True;
+    bytes values are stored as-is and read back with mget_bytes.
+    """
+
+    # True when every worker sees the same data (i.e. a network store)
+    shared: bool = False
+
+    # ─── keys ────────────────────────────────────────────────────────────────
+    @abstractmethod
+    async def get(self, key: str) -> str | None: ...
+    @abstractmethod
+    async def set(self, key: str, value, ex: int | None = None) -> bool: ...
+    @abstractmethod
+    async def delete(self, *keys: str) -> int: ...
+    @abstractmethod
+    async def exists(self, key: str) -> int: ...
+    @abstractmethod
+    async def expire(self, key: str, seconds: int) -> bool: ...
+    @abstractmethod
+    async def ttl(self, key: str) -> int: ...
+    @abstractmethod
+    async def mget_bytes(self, *keys: str) -> list[bytes | None]:
+        """
+        Raw values for several string keys in one round trip (None if missing).
+        """
+
+    # ─── hashes ──────────────────────────────────────────────────────────────
+    @abstractmethod
+    async def hset(self, key: str, mapping: dict) -> int: ...
+    @abstractmethod
+    async def hget(self, key: str, field: str) -> str | None: ...
+    @abstractmethod
+    async def hgetall(self, key: str) -> dict: ...
+
+    # ─── sorted sets ─────────────────────────────────────────────────────────
+    @abstractmethod
+    async def zadd(self, key: str, mapping: dict) -> int: ...
+    @abstractmethod
+    async def zincrby(self, key: str, amount: float, member: str) -> float: ...
+    @abstractmethod
+    async def zrem(self, key: str, *members: str) -> int: ...
+    @abstractmethod
+    async def zscore(self, key: str, member: str) -> float | None: ...
+    @abstractmethod
+    async def zcard(self, key: str) -> int: ...
+    @abstractmethod
+    async def zrevrange(self, key: str, start: int, stop: int, withscores: bool = False) -> list: ...
+    @abstractmethod
+    async def zremrangebyrank(self, key: str, start: int, stop: int) -> int: ...
+    @abstractmethod
+    async def zunionstore(self, dest: str, keys, aggregate: str = "SUM") -> int: ...
+
+    # ─── HyperLogLogs ────────────────────────────────────────────────────────
+    @abstractmethod
+    async def pfadd(self, key: str, *elements: str) -> int: ...
+    @abstractmethod
+    async def pfcount(self, key: str) -> int: ...
+
+    # ─── batching & messaging ────────────────────────────────────────────────
+    @abstractmethod
+    def pipeline(self, transaction: bool = False):
+        """
+        Async context manager; commands are queued by calling them without
+        await and run by `await pipe.execute()`.
+        """
+    @abstractmethod
+    async def publish(self, channel: str, message: str) -> int: ...
+    @abstractmethod
+    def subscribe(self, *channels: str) -> AsyncIterator[tuple[str, str]]:
+        """
+        Async iterator of (channel, message) pairs.
+        """
+    @abstractmethod
+    async def close(self) -> None: ...
+
+# ─── Redis ───────────────────────────────────────────────────────────────────
+class _RedisPipeline:
+    """
+    Wraps a redis-py pipeline so queued calls take the same arguments as
+    the CacheBackend methods (redis-py's hset wants mapping= by keyword).
+    """
+
+    def __init__(self, pipe):
+        self._pipe = pipe
+
+    def hset(self, key, mapping):
+        self._pipe.hset(key, mapping=mapping)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._pipe, name)
+
+    async def __aenter__(self):
+        await self._pipe.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._pipe.__aexit__(*exc)
+
+class RedisBackend(CacheBackend):
+    """
+    Thin adapter over a redis.asyncio client (decode_responses=True).
+    Binary reads go through a second client on an identical pool that
+    leaves responses undecoded.
+    """
+
+    shared = True
+
+    def __init__(self, client):
+        self.client = client
+        pool = client.connection_pool
+        self.binary = client.__class__(connection_pool=pool.__class__(
+            connection_class=pool.connection_class,
+            max_connections=pool.max_connections,
+            **{**pool.connection_kwargs, "decode_responses": False},
+        ))
+
+    async def get(self, key):
+        return await self.client.get(key)
+
+    async def set(self, key, value, ex=None):
+        return bool(await self.client.set(key, value, ex=ex))
+
+    async def delete(self, *keys):
+        return await self.client.delete(*keys) if keys else 0
+
+    async def exists(self, key):
+        return await self.client.exists(key)
+
+    async def expire(self, key, seconds):
+        return bool(await self.client.expire(key, seconds))
+
+    async def ttl(self, key):
+        return await self.client.ttl(key)
+
+    async def mget_bytes(self, *keys):
+        return await self.binary.mget(keys) if keys else []
+
+    async def hset(self, key, mapping):
+        return await self.client.hset(key, mapping=mapping)
+
+    async def hget(self, key, field):
+        return await self.client.hget(key, field)
+
+    async def hgetall(self, key):
+        return await self.client.hgetall(key)
+
+    async def zadd(self, key, mapping):
+        return await self.client.zadd(key, mapping)
+
+    async def zincrby(self, key, amount, member):
+        return float(await self.client.zincrby(key, amount, member))
+
+    async def zrem(self, key, *members):
+        return await self.client.zrem(key, *members)
+
+    async def zscore(self, key, member):
+        return await self.client.zscore(key, member)
+
+    async def zcard(self, key):
+        return await self.client.zcard(key)
+
+    async def zrevrange(self, key, start, stop, withscores=False):
+        return await self.client.zrevrange(key, start, stop, withscores=withscores)
+
+    async def zremrangebyrank(self, key, start, stop):
+        return await self.client.zremrangebyrank(key, start, stop)
+
+    async def zunionstore(self, dest, keys, aggregate="SUM"):
+        return await self.client.zunionstore(dest, keys, aggregate=aggregate)
+
+    async def pfadd(self, key, *elements):
+        return await self.client.pfadd(key, *elements)
+
+    async def pfcount(self, key):
+        return await self.client.pfcount(key)
+
+    def pipeline(self, transaction=False):
+        return _RedisPipeline(self.client.pipeline(transaction=transaction))
+
+    async def publish(self, channel, message):
+        return await self.client.publish(channel, message)
+
+    async def subscribe(self, *channels):
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(*channels)
+        try:
+            async for msg in pubsub.listen():
+                if msg["type"] == "message":
+                    yield msg["channel"], msg["data"]
+        finally:
+            await pubsub.reset()
+
+    async def close(self):
+        await self.binary.close()
+        await self.client.close()
+
+# ─── Embedded ────────────────────────────────────────────────────────────────
+class SortedList:
+    """
+    Sorted sequence stored as a list of bounded sublists (the layout used by
+    sortedcontainers): inserts and deletes only shift one sublist, so they
+    stay cheap as the set grows, and positional access is a short scan over
+    sublist lengths.
+    """
+
+    def __init__(self, load: int = 512):
+        self._load = load
+        self._lists: list[list] = []
+        self._maxes: list = []
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, value) -> None:
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+        else:
+            i = bisect_left(self._maxes, value)
+            if i == len(self._maxes):
+                i -= 1
+                self._lists[i].append(value)
+                self._maxes[i] = value
+            else:
+                insort(self._lists[i], value)
+            if len(self._lists[i]) > 2 * self._load:
+                half = self._lists[i][self._load:]
+                del self._lists[i][self._load:]
+                self._maxes[i] = self._lists[i][-1]
+                self._lists.insert(i + 1, half)
+                self._maxes.insert(i + 1, half[-1])
+        self._len += 1
+
+    def remove(self, value) -> None:
+        i = bisect_left(self._maxes, value)
+        sub = self._lists[i]
+        del sub[bisect_left(sub, value)]
+        self._len -= 1
+        if not sub:
+            del self._lists[i]
+            del self._maxes[i]
+        else:
+            self._maxes[i] = sub[-1]
+
+    def slice(self, start: int, stop: int) -> list:
+        """
+        Items with positions in [start, stop), in ascending order.
+        """
+        out = []
+        pos = 0
+        for sub in self._lists:
+            end = pos + len(sub)
+            if end > start and pos < stop:
+                out.extend(sub[max(0, start - pos):stop - pos])
+            if end >= stop:
+                break
+            pos = end
+        return out
+
+class _ZSet:
+    __slots__ = ("scores", "order")
+
+    def __init__(self):
+        self.scores: dict[str, float] = {}
+        self.order = SortedList()
+
+    def set(self, member: str, score: float) -> bool:
+        old = self.scores.get(member)
+        if old is not None:
+            self.order.remove((old, member))
+        self.scores[member] = score
+        self.order.add((score, member))
+        return old is None
+
+    def remove(self, member: str) -> bool:
+        old = self.scores.pop(member, None)
+        if old is None:
+            return False
+        self.order.remove((old, member))
+        return True
+
+# 2**-rank for every possible register value
+_INVERSE_POWERS = [2.0 ** -r for r in range(65)]
+
+class HyperLogLog:
+    """
+    In-process HyperLogLog with Redis's precision (2**14 registers, ~0.81%
+    standard error). Until it has seen SPARSE_LIMIT distinct elements it
+    keeps their 64-bit hashes and counts exactly, then switches to a fixed
+    16 KB register array.
+    """
+    __slots__ = ("p", "m", "_hashes", "_registers")
+
+    SPARSE_LIMIT = 64
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self._hashes: set[int] | None = set()
+        self._registers: bytearray | None = None
+
+    @staticmethod
+    def _hash(element) -> int:
+        digest = hashlib.blake2b(str(element).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
+
+    def _set(self, h: int) -> bool:
+        index = h & (self.m - 1)
+        w = h >> self.p
+        # position of the lowest set bit, i.e. trailing zeros + 1
+        rank = (w & -w).bit_length() if w else 64 - self.p + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+            return True
+        return False
+
+    def add(self, element) -> bool:
+        """
+        Add an element; True if the estimate may have changed.
+        """
+        h = self._hash(element)
+        if self._registers is not None:
+            return self._set(h)
+        if h in self._hashes:
+            return False
+        self._hashes.add(h)
+        if len(self._hashes) > self.SPARSE_LIMIT:
+            self._registers = bytearray(self.m)
+            for seen in self._hashes:
+                self._set(seen)
+            self._hashes = None
+        return True
+
+    def count(self) -> int:
+        if self._registers is None:
+            return len(self._hashes)
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, self._registers))
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+class _MemoryPipeline:
+    """
+    Queues backend calls and runs them back to back on execute(). Nothing
+    else can run on the event loop in between, so it's also atomic.
+    """
+
+    def __init__(self, backend: "MemoryBackend"):
+        self._backend = backend
+        self._queue = []
+
+    def __getattr__(self, name):
+        method = getattr(self._backend, name)
+
+        def queue(*args, **kwargs):
+            self._queue.append((method, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> list:
+        queue, self._queue = self._queue, []
+        return [await method(*args, **kwargs) for method, args, kwargs in queue]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._queue = []
+
+class MemoryBackend(CacheBackend):
+    """
+    In-process backend for single-node deployments, tests and benchmarks.
+    Expired keys are dropped lazily on access and by a periodic sweep over
+    an expiry heap, so memory doesn't grow with keys nobody reads again.
+    """
+
+    def __init__(self, sweep_interval: float = 1.0):
+        self._data: dict[str, object] = {}
+        # {key: absolute monotonic expiry}
+        self._expires: dict[str, float] = {}
+        # (expiry, key) min-heap; stale entries are skipped when popped
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._sweep_interval = sweep_interval
+        self._last_sweep = time.monotonic()
+        # {channel: set of subscriber queues}
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+    # ─── expiry ──────────────────────────────────────────────────────────────
+    def _alive(self, key: str) -> bool:
+        exp = self._expires.get(key)
+        if exp is not None and exp <= time.monotonic():
+            self._data.pop(key, None)
+            del self._expires[key]
+        return key in self._data
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        if now - self._last_sweep < self._sweep_interval:
+            return
+        self._last_sweep = now
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            exp, key = heapq.heappop(self._expiry_heap)
+            if self._expires.get(key) == exp:
+                self._data.pop(key, None)
+                del self._expires[key]
+
+    def _get(self, key: str, kind: type):
+        if not self._alive(key):
+            return None
+        value = self._data[key]
+        if not isinstance(value, kind):
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _get_or_create(self, key: str, kind: type):
+        self._sweep()
+        value = self._get(key, kind)
+        if value is None:
+            value = self._data[key] = kind()
+        return value
+
+    def _drop(self, key: str) -> bool:
+        self._expires.pop(key, None)
+        return self._data.pop(key, None) is not None
+
+    # ─── keys ────────────────────────────────────────────────────────────────
+    async def get(self, key):
+        value = self._get(key, (str, bytes))
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def set(self, key, value, ex=None):
+        self._sweep()
+        self._drop(key)
+        self._data[key] = value if isinstance(value, bytes) else str(value)
+        if ex:
+            await self.expire(key, ex)
+        return True
+
+    async def delete(self, *keys):
+        return sum(self._alive(k) and self._drop(k) for k in keys)
+
+    async def exists(self, key):
+        return int(self._alive(key))
+
+    async def expire(self, key, seconds):
+        if not self._alive(key):
+            return False
+        if seconds <= 0:
+            return self._drop(key)
+        exp = time.monotonic() + seconds
+        self._expires[key] = exp
+        heapq.heappush(self._expiry_heap, (exp, key))
+        return True
+
+    async def mget_bytes(self, *keys):
+        values = []
+        for key in keys:
+            value = self._data[key] if self._alive(key) else None
+            # like MGET, keys holding another type read as missing
+            if isinstance(value, str):
+                value = value.encode("utf-8")
+            values.append(value if isinstance(value, bytes) else None)
+        return values
+
+    async def ttl(self, key):
+        if not self._alive(key):
+            return -2
+        exp = self._expires.get(key)
+        return -1 if exp is None else max(0, round(exp - time.monotonic()))
+
+    # ─── hashes ──────────────────────────────────────────────────────────────
+    async def hset(self, key, mapping):
+        h = self._get_or_create(key, dict)
+        added = sum(f not in h for f in mapping)
+        h.update({str(f): str(v) for f, v in mapping.items()})
+        return added
+
+    async def hget(self, key, field):
+        h = self._get(key, dict)
+        return h.get(field) if h else None
+
+    async def hgetall(self, key):
+        h = self._get(key, dict)
+        return dict(h) if h else {}
+
+    # ─── sorted sets ─────────────────────────────────────────────────────────
+    async def zadd(self, key, mapping):
+        z = self._get_or_create(key, _ZSet)
+        return sum(z.set(str(m), float(s)) for m, s in mapping.items())
+
+    async def zincrby(self, key, amount, member):
+        z = self._get_or_create(key, _ZSet)
+        score = z.scores.get(member, 0.0) + float(amount)
+        z.set(member, score)
+        return score
+
+    async def zrem(self, key, *members):
+        z = self._get(key, _ZSet)
+        if z is None:
+            return 0
+        removed = sum(z.remove(m) for m in members)
+        if not z.scores:
+            self._drop(key)
+        return removed
+
+    async def zscore(self, key, member):
+        z = self._get(key, _ZSet)
+        return z.scores.get(member) if z else None
+
+    async def zcard(self, key):
+        z = self._get(key, _ZSet)
+        return len(z.scores) if z else 0
+
+    async def zrevrange(self, key, start, stop, withscores=False):
+        z = self._get(key, _ZSet)
+        if z is None:
+            return []
+        n = len(z.order)
+        # Redis semantics: inclusive stop, negative indexes count from the end
+        start = max(0, start + n if start < 0 else start)
+        stop = min(n - 1, stop + n if stop < 0 else stop)
+        if start > stop:
+            return []
+        items = z.order.slice(n - 1 - stop, n - start)[::-1]
+        return [(m, s) for s, m in items] if withscores else [m for _, m in items]
+
+    async def zremrangebyrank(self, key, start, stop):
+        z = self._get(key, _ZSet)
+        if z is None:
+            return 0
+        n = len(z.order)
+        # ranks ascend by score; same index rules as zrevrange
+        start = max(0, start + n if start < 0 else start)
+        stop = min(n - 1, stop + n if stop < 0 else stop)
+        if start > stop:
+            return 0
+        victims = [m for _, m in z.order.slice(start, stop + 1)]
+        for member in victims:
+            z.remove(member)
+        if not z.scores:
+            self._drop(key)
+        return len(victims)
+
+    async def zunionstore(self, dest, keys, aggregate="SUM"):
+        weights = keys if isinstance(keys, dict) else {k: 1.0 for k in keys}
+        combine = {"SUM": lambda a, b: a + b, "MIN": min, "MAX": max}[aggregate.upper()]
+        totals: dict[str, float] = {}
+        for key, weight in weights.items():
+            z = self._get(key, _ZSet)
+            if z is None:
+                continue
+            for member, score in z.scores.items():
+                score *= weight
+                totals[member] = combine(totals[member], score) if member in totals else score
+        self._drop(dest)
+        if totals:
+            await self.zadd(dest, totals)
+        return len(totals)
+
+    # ─── HyperLogLogs ────────────────────────────────────────────────────────
+    async def pfadd(self, key, *elements):
+        hll = self._get_or_create(key, HyperLogLog)
+        return int(sum(hll.add(e) for e in elements) > 0)
+
+    async def pfcount(self, key):
+        hll = self._get(key, HyperLogLog)
+        return hll.count() if hll else 0
+
+    # ─── batching & messaging ────────────────────────────────────────────────
+    def pipeline(self, transaction=False):
+        return _MemoryPipeline(self)
+
+    async def publish(self, channel, message):
+        queues = self._subscribers.get(channel, ())
+        for q in queues:
+            q.put_nowait((channel, str(message)))
+        return len(queues)
+
+    async def subscribe(self, *channels):
+        q: asyncio.Queue = asyncio.Queue()
+        for channel in channels:
+            self._subscribers[channel].add(q)
+        try:
+            while True:
+                yield await q.get()
+        finally:
+            for channel in channels:
+                self._subscribers[channel].discard(q)
+
+    async def close(self):
+        self._data.clear()
+        self._expires.clear()
+        self._expiry_heap.clear()
@@ -1,7 +1,12 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from . import models, schemas
-from datetime import datetime, timezone
+from sqlalchemy import desc, func, literal, select, tuple_
+from . import account_stats, models, schemas  # account_stats registers the counter listeners
+from .outbox import add_event
+from datetime import datetime, timedelta, timezone
+
+# Searches scan this many recent days first (the newest partitions on
+# partitioned Postgres) before touching older live tweets.
+HOT_SEARCH_WINDOW = timedelta(days=30)
 
 # Account operations
 def get_account_by_id(db: Session, account_id: int):
@@ -30,12 +35,47 @@ def search_accounts(db: Session, query: str):
 def get_tweet(db: Session, tweet_id: int):
     return db.query(models.Tweet).filter(models.Tweet.id == tweet_id).first()
 
+def get_tweets_by_ids(db: Session, tweet_ids):
+    """
+    (id, content, user_id, created_at, username) rows for the given ids in
+    one query; ids that don't exist are simply absent.
+    """
+    if not tweet_ids:
+        return []
+    return (
+        db.query(
+            models.Tweet.id, models.Tweet.content, models.Tweet.user_id,
+            models.Tweet.created_at, models.Account.username,
+        )
+        .outerjoin(models.Account, models.Account.id == models.Tweet.user_id)
+        .filter(models.Tweet.id.in_(tweet_ids))
+        .all()
+    )
+
+def get_account_tweets(db: Session, account_id: int, limit: int = 20, before=None):
+    """
+    One author's tweets, newest first. `before` is the (created_at, id) of
+    the last tweet of the previous page; the page seeks on the
+    (user_id, created_at DESC, id DESC) index instead of counting past an offset.
+    """
+    q = db.query(models.Tweet).filter(models.Tweet.user_id == account_id)
+    if before is not None:
+        created_at, tweet_id = before
+        # compare against the stored value while the anchor tweet exists, so
+        # timestamp formatting (e.g. SQLite text) can't skip or repeat rows
+        anchor = select(models.Tweet.created_at).where(models.Tweet.id == tweet_id).scalar_subquery()
+        since = func.coalesce(anchor, literal(created_at, models.Tweet.created_at.type))
+        q = q.filter(tuple_(models.Tweet.created_at, models.Tweet.id) < tuple_(since, tweet_id))
+    return q.order_by(desc(models.Tweet.created_at), desc(models.Tweet.id)).limit(limit).all()
+
 def get_tweets(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Tweet).order_by(desc(models.Tweet.created_at)).offset(skip).limit(limit).all()
 
 def create_tweet(db: Session, tweet: schemas.TweetCreate, account_id: int):
-    db_tweet = models.Tweet(content=tweet.content, account_id=account_id)
+    db_tweet = models.Tweet(content=tweet.content, user_id=account_id)
     db.add(db_tweet)
+    db.flush()  # assigns the id the outbox event refers to
+    add_event(db, "tweet.created", db_tweet.id)
     db.commit()
     db.refresh(db_tweet)
     return db_tweet
@@ -44,7 +84,7 @@ def update_tweet(db: Session, tweet_id: int, content: str):
     db_tweet = db.query(models.Tweet).filter(models.Tweet.id == tweet_id).first()
     if db_tweet:
         db_tweet.content = content
-        db_tweet.updated_at = datetime.now(timezone.utc)
+        add_event(db, "tweet.updated", db_tweet.id)
         db.commit()
         db.refresh(db_tweet)
     return db_tweet
@@ -53,12 +93,36 @@ def delete_tweet(db: Session, tweet_id: int):
     db_tweet = db.query(models.Tweet).filter(models.Tweet.id == tweet_id).first()
     if db_tweet:
         db.delete(db_tweet)
+        add_event(db, "tweet.deleted", tweet_id)
         db.commit()
         return True
     return False
 
-def search_tweets(db: Session, keyword: str):
-    return db.query(models.Tweet).filter(models.Tweet.content.ilike(f"%{keyword}%")).all()
+def search_tweets(db: Session, keyword: str, limit: int | None = None, include_archive: bool = False):
+    """
+    Newest matches first: hot window, then older live tweets, then (only if
+    asked) the archive. Each later stage runs only if `limit` isn't met yet.
+    """
+    pattern = f"%{keyword}%"
+    hot_since = datetime.now(timezone.utc) - HOT_SEARCH_WINDOW
+    live = db.query(models.Tweet).filter(models.Tweet.content.ilike(pattern))
+    stages = [
+        live.filter(models.Tweet.created_at >= hot_since).order_by(desc(models.Tweet.created_at)),
+        live.filter(models.Tweet.created_at < hot_since).order_by(desc(models.Tweet.created_at)),
+    ]
+    if include_archive:
+        stages.append(
+            db.query(models.TweetArchive)
+            .filter(models.TweetArchive.content.ilike(pattern))
+            .order_by(desc(models.TweetArchive.created_at))
+        )
+    results = []
+    for stage in stages:
+        remaining = None if limit is None else limit - len(results)
+        if remaining == 0:
+            break
+        results.extend(stage.limit(remaining).all())
+    return results
 
 def search_hashtags(db: Session, tag: str):
     return db.query(models.Tweet).filter(models.Tweet.content.ilike(f"%#{tag}%")).all()
\ No newline at end of file
@@ -1,6 +1,16 @@
-from sqlalchemy import create_engine
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from functools import partial
+
+import anyio.from_thread
+from fastapi import Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from app import cache
 from app.utils.settings import settings  # load DATABASE_URL from .env
 
 # ----------------------------------------------------------------
@@ -18,6 +28,70 @@ engine = create_engine(
 # Base class for ORM models; your models should inherit from this.
 Base = declarative_base()
 
+# ----------------------------------------------------------------
+# READ REPLICAS
+# ----------------------------------------------------------------
+class ReplicaPool:
+    """
+    Round-robin over read replica engines. A replica whose connection fails
+    is skipped for `retry_seconds`; if none are healthy, reads go to the
+    primary.
+    """
+
+    def __init__(self, engines: list, retry_seconds: float = 30.0):
+        self.engines = list(engines)
+        self.retry_seconds = retry_seconds
+        # {engine: monotonic time until which it is skipped}
+        self._down_until: dict = {}
+        self._cycle = itertools.cycle(self.engines) if self.engines else None
+        self._lock = threading.Lock()
+        for eng in self.engines:
+            event.listen(eng, "handle_error", self._on_error)
+
+    def _on_error(self, ctx) -> None:
+        # only connection-level failures mark a replica down, not bad SQL
+        if ctx.is_disconnect or ctx.connection is None:
+            self.mark_down(ctx.engine)
+
+    def mark_down(self, eng) -> None:
+        logging.warning(f"Read replica {eng.url!r} marked unhealthy")
+        with self._lock:
+            self._down_until[eng] = time.monotonic() + self.retry_seconds
+
+    def choose(self):
+        """
+        Return the next healthy replica engine, or None.
+        """
+        if not self._cycle:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                eng = next(self._cycle)
+                if self._down_until.get(eng, 0) <= now:
+                    self._down_until.pop(eng, None)
+                    return eng
+        return None
+
+replicas = ReplicaPool(
+    [create_engine(url, pool_pre_ping=True, future=True) for url in settings.database_replica_urls],
+    retry_seconds=settings.replica_retry_seconds,
+)
+
+class ReplicaSession(Session):
+    """
+    Session for read-only dependencies. Picks one replica on first use and
+    keeps it for the rest of the session so a request sees one consistent
+    snapshot; anything that flushes still goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing:
+            return engine
+        if "replica" not in self.info:
+            self.info["replica"] = replicas.choose() or engine
+        return self.info["replica"]
+
 # ----------------------------------------------------------------
 # SESSION FACTORY
 # ----------------------------------------------------------------
@@ -32,15 +106,88 @@ SessionLocal = sessionmaker(
     class_=Session,    # <-- ensure we instantiate actual Session objects
 )
 
+# Same settings, but routed to the replicas.
+ReadSessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    class_=ReplicaSession,
+)
+
+@event.listens_for(SessionLocal, "after_flush")
+def _remember_write(session, flush_context):
+    session.info["wrote"] = True
+
+# ----------------------------------------------------------------
+# READ-YOUR-WRITES
+# ----------------------------------------------------------------
+# With Redis, the marker is a key with a TTL so every worker sees it: a
+# client that writes through one worker and reads through another still
+# gets the primary. The dependencies run in the threadpool and reach the
+# async client through the event loop (one round trip per read request).
+# Without Redis, {client key: monotonic deadline} in this process.
+_recent_writers: dict[str, float] = {}
+
+def _client_key(request: Request) -> str:
+    host = request.client.host if request.client else "unknown"
+    raw = f"{host}:{request.headers.get('authorization', '')}"
+    return "rw:" + hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+def _mark_writer(key: str) -> None:
+    client = cache.redis_client
+    if client is not None:
+        ttl_ms = max(1, int(settings.replica_sticky_seconds * 1000))
+        try:
+            anyio.from_thread.run(partial(client.set, key, "1", px=ttl_ms))
+            return
+        except Exception as e:
+            logging.warning(f"Couldn't share read-your-writes marker, keeping it in this worker: {e!r}")
+    now = time.monotonic()
+    _recent_writers[key] = now + settings.replica_sticky_seconds
+    # prune lazily so the map only holds clients inside their window
+    if len(_recent_writers) > 10_000:
+        for k in [k for k, t in _recent_writers.items() if t <= now]:
+            del _recent_writers[k]
+
+def _is_recent_writer(key: str) -> bool:
+    if _recent_writers.get(key, 0) > time.monotonic():
+        return True
+    client = cache.redis_client
+    if client is None:
+        return False
+    try:
+        return bool(anyio.from_thread.run(client.exists, key))
+    except Exception as e:
+        # can't tell: reading from the primary is always consistent
+        logging.warning(f"Couldn't read read-your-writes marker, using the primary: {e!r}")
+        return True
+
 # ----------------------------------------------------------------
 # DEPENDENCY
 # ----------------------------------------------------------------
-def get_db():
+def get_db(request: Request):
     """
     FastAPI dependency that yields a database session and ensures it is closed
     after the request finishes (regardless of exceptions).
+    Requests that write pin the client's reads to the primary for a while.
     """
     db: Session = SessionLocal()  # <-- create a new Session instance
+    try:
+        yield db
+    finally:
+        if db.info.get("wrote") and replicas.engines:
+            _mark_writer(_client_key(request))
+        db.close()
+
+def get_read_db(request: Request):
+    """
+    Like get_db, for endpoints that only read: the session is served by a
+    replica unless this client wrote within the sticky window.
+    """
+    if replicas.engines and not _is_recent_writer(_client_key(request)):
+        db: Session = ReadSessionLocal()
+    else:
+        db = SessionLocal()
     try:
         yield db
     finally:
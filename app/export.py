@@ -0,0 +1,82 @@
+# app/export.py
+
+import json
+import zlib
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Account, Tweet
+
+# rows fetched per round trip when streaming from a server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+def _tweet_row(t: Tweet) -> dict:
+    return {
+        "id": t.id,
+        "content": t.content,
+        "user_id": t.user_id,
+        "created_at": t.created_at.isoformat() if t.created_at else None,
+    }
+
+def _account_row(a: Account) -> dict:
+    # hashed_password is deliberately left out of exports
+    return {
+        "id": a.id,
+        "username": a.username,
+        "email": a.email,
+        "created_at": a.created_at.isoformat() if a.created_at else None,
+    }
+
+# model + row serializer for every exportable table
+EXPORTERS = {
+    "tweets": (Tweet, _tweet_row),
+    "accounts": (Account, _account_row),
+}
+
+def iter_rows(db: Session, table: str, since_id: int = 0,
+              batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Yield rows of `table` with id > since_id in ascending id order.
+    Uses a server-side cursor (stream_results + yield_per) so memory stays
+    constant no matter how many rows are exported. Resume an interrupted
+    export by passing the last id that was written as `since_id`.
+    """
+    model, serialize = EXPORTERS[table]
+    stmt = (
+        select(model)
+        .where(model.id > since_id)
+        .order_by(model.id)
+        .execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for obj in db.scalars(stmt):
+        yield serialize(obj)
+        # drop the instance from the identity map so it can be collected
+        db.expunge(obj)
+
+def iter_ndjson(db: Session, table: str, since_id: int = 0,
+                batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Encode rows as newline-delimited JSON, one chunk per batch of rows.
+    """
+    buf = []
+    for row in iter_rows(db, table, since_id, batch_size):
+        buf.append(json.dumps(row, separators=(",", ":")))
+        if len(buf) >= batch_size:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+            buf = []
+    if buf:
+        yield ("\n".join(buf) + "\n").encode("utf-8")
+
+def gzip_stream(chunks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compress a byte stream into a single gzip member on the fly.
+    """
+    # wbits=31 → gzip header and trailer instead of a raw zlib stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
@@ -0,0 +1,104 @@
+# app/impressions.py
+
+import hashlib
+import logging
+import threading
+from collections import defaultdict
+
+from fastapi import Request
+
+from app import cache
+from app.utils.settings import settings
+
+# sorted set {tweet id: times served}
+TOTALS_KEY = "impressions:total"
+
+def viewers_key(tweet_id: int) -> str:
+    # HyperLogLog of the distinct viewers of one tweet
+    return f"impressions:viewers:{tweet_id}"
+
+def viewer_id(request: Request) -> str:
+    """
+    Opaque id for whoever made the request: their address plus user agent.
+    Never the bearer token: login hands every session the same one, so it
+    can't tell viewers apart. Only a short hash is kept.
+    """
+    host = request.client.host if request.client else "unknown"
+    raw = f"{host}:{request.headers.get('user-agent', '')}"
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=8).hexdigest()
+
+class ImpressionBatcher:
+    """
+    Collects which tweets were shown to whom and writes them to the cache
+    backend in one pipelined round trip per interval: each tweet's total
+    is incremented and its viewers are PFADDed into a per-tweet
+    HyperLogLog, which stays at a fixed size (~12 KB in Redis) however many
+    distinct viewers it counts.
+    """
+
+    def __init__(self, interval: float = 2.0, ttl_seconds: int = 30 * 86400):
+        # seconds between flushes (run by the scheduler in every worker)
+        self.interval = interval
+        # viewer sets of tweets nobody has viewed for this long expire
+        self.ttl_seconds = ttl_seconds
+        # {tweet_id: impressions} and {tweet_id: {viewer, ...}} since the last flush
+        self._totals = defaultdict(int)
+        self._viewers = defaultdict(set)
+        # sync endpoints record from the threadpool
+        self._lock = threading.Lock()
+
+    def record(self, viewer: str, tweet_ids) -> None:
+        """
+        Record one response that showed `tweet_ids` to `viewer`; a tweet
+        listed twice in the same response counts once.
+        """
+        with self._lock:
+            for tweet_id in set(tweet_ids):
+                self._totals[tweet_id] += 1
+                self._viewers[tweet_id].add(viewer)
+
+    async def flush(self) -> int:
+        """
+        Write pending impressions; returns the number of tweets touched.
+        A failed write is dropped rather than retried: the counts are
+        approximate anyway and must not pile up while the cache is down.
+        """
+        with self._lock:
+            if not self._totals:
+                return 0
+            totals, viewers = self._totals, self._viewers
+            self._totals, self._viewers = defaultdict(int), defaultdict(set)
+        try:
+            async with cache.backend.pipeline(transaction=False) as pipe:
+                for tweet_id, count in totals.items():
+                    key = viewers_key(tweet_id)
+                    pipe.zincrby(TOTALS_KEY, count, str(tweet_id))
+                    pipe.pfadd(key, *viewers[tweet_id])
+                    pipe.expire(key, self.ttl_seconds)
+                await pipe.execute()
+        except Exception:
+            logging.exception(f"Failed to flush impressions for {len(totals)} tweets")
+        return len(totals)
+
+    async def stats(self, tweet_id: int) -> dict:
+        """
+        Flushed impressions and approximate unique viewers of one tweet.
+        """
+        async with cache.backend.pipeline(transaction=False) as pipe:
+            pipe.zscore(TOTALS_KEY, str(tweet_id))
+            pipe.pfcount(viewers_key(tweet_id))
+            total, unique = await pipe.execute()
+        return {"tweet_id": tweet_id, "impressions": int(total or 0), "unique_viewers": unique}
+
+    async def forget(self, tweet_id: int) -> None:
+        """
+        Drop a deleted tweet's counters.
+        """
+        await cache.backend.zrem(TOTALS_KEY, str(tweet_id))
+        await cache.backend.delete(viewers_key(tweet_id))
+
+# singleton batcher, flushed by the scheduler (see app.jobs)
+impressions = ImpressionBatcher(
+    interval=settings.impression_flush_seconds,
+    ttl_seconds=settings.impression_ttl_days * 86400,
+)
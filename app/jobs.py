@@ -0,0 +1,68 @@
+# app/jobs.py
+
+import asyncio
+
+from app import account_stats, cache
+from app.archiver import archiver
+from app.database import ReadSessionLocal, SessionLocal
+from app.impressions import impressions
+from app.like_batcher import like_batcher
+from app.models import Account, Tweet
+from app.partitions import ensure_tweet_partitions
+from app.scheduler import Scheduler
+from app.trending import trending
+from app.utils.settings import settings
+
+def _newest_tweet_rows(limit: int) -> list:
+    db = ReadSessionLocal()
+    try:
+        return (
+            db.query(Tweet.id, Tweet.content, Tweet.user_id, Tweet.created_at, Account.username)
+            .outerjoin(Account, Account.id == Tweet.user_id)
+            .order_by(Tweet.created_at.desc(), Tweet.id.desc())
+            .limit(limit)
+            .all()
+        )
+    finally:
+        db.close()
+
+async def warm_tweet_cache() -> None:
+    """
+    Re-cache the newest tweets so reads keep hitting after entries expire
+    or the cache restarts.
+    """
+    rows = await asyncio.to_thread(_newest_tweet_rows, settings.timeline_buffer_size)
+    if rows:
+        await cache.set_tweets_cache(rows, recent=True)
+
+def reconcile_account_stats() -> int:
+    db = SessionLocal()
+    try:
+        return account_stats.reconcile(db)
+    finally:
+        db.close()
+
+def register_jobs(scheduler: Scheduler) -> None:
+    """
+    Every periodic task of the app. Per-worker jobs drain in-memory
+    buffers, so each process runs them (and once more on shutdown);
+    the rest is cluster-wide and runs on the elected leader only.
+    """
+    # ─── per worker ──────────────────────────────────────────────────────────
+    scheduler.add("likes.flush", like_batcher.flush, like_batcher.interval,
+                  leader_only=False, run_on_shutdown=True)
+    scheduler.add("impressions.flush", impressions.flush, impressions.interval,
+                  leader_only=False, run_on_shutdown=True)
+    scheduler.add("trending.flush", trending.flush, settings.trending_flush_seconds,
+                  leader_only=False, run_on_shutdown=True)
+
+    # ─── cluster-wide (leader) ───────────────────────────────────────────────
+    scheduler.add("cache.warm", warm_tweet_cache, settings.cache_warm_seconds)
+    scheduler.add("accounts.reconcile", reconcile_account_stats, settings.counter_reconcile_seconds)
+    # creates next months' partitions ahead of time (no-op unless partitioned)
+    scheduler.add("tweets.partitions", ensure_tweet_partitions, 86400)
+    if settings.tweet_retention_days > 0:
+        def archive_tweets() -> int:
+            # a long pass stops between batches once this node stops leading
+            return archiver.run_once(still_leader=lambda: scheduler.election.is_leader)
+        scheduler.add("tweets.archive", archive_tweets, archiver.interval)
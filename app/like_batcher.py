@@ -9,7 +9,8 @@ from app.models import Like             # ORM model for likes
 class LikeBatcher:
     """
     Batches like increments in memory and writes them to the database
-    in bulk at regular intervals or on shutdown.
+    in bulk at regular intervals or on shutdown. The scheduler calls
+    flush() in every worker (see app.jobs).
     """
 
     def __init__(self, interval: int = 5):
@@ -17,43 +18,8 @@ class LikeBatcher:
         self.interval = interval
         # in-memory counter: {tweet_id: count}
         self._counters = defaultdict(int)
-        # event loop task reference
-        self._task = None
         # lock to protect counters across coroutines
         self._lock = asyncio.Lock()
-        # flag to signal shutdown
-        self._running = False
-
-    def start(self):
-        """
-        Begin the periodic flush loop.
-        Called once during application startup.
-        """
-        if not self._running:
-            self._running = True
-            # schedule the background task
-            self._task = asyncio.create_task(self._run())
-
-    async def stop(self):
-        """
-        Stop the periodic loop and perform one final flush.
-        Called during application shutdown.
-        """
-        self._running = False
-        if self._task:
-            # wait for background task to finish
-            await self._task
-        await self.flush()
-
-    async def _run(self):
-        """
-        Internal loop that flushes counters every `interval` seconds.
-        """
-        logging.info(f"LikeBatcher running: flush every {self.interval}s")
-        while self._running:
-            # wait for next interval
-            await asyncio.sleep(self.interval)
-            await self.flush()  # flush any collected likes
 
     async def add_like(self, tweet_id: int):
         """
@@ -1,8 +1,17 @@
 # app/models.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, func, UniqueConstraint
 from sqlalchemy.orm import relationship
-from app.database import Base
+from app.database import Base, engine
+from app.utils.settings import settings
+
+# Monthly RANGE partitioning puts created_at into the primary key, and
+# Postgres can't point a foreign key at a partitioned table, so likes only
+# reference tweets at the ORM level in that mode. SQLite & co. always get
+# the plain single table. The flag only describes tables created with it
+# set; app/partitions.py covers converting an existing database.
+TWEETS_PARTITIONED = settings.tweets_partitioned and engine.dialect.name == "postgresql"
+_tweet_fk = () if TWEETS_PARTITIONED else (ForeignKey("tweets.id", ondelete="CASCADE"),)
 
 class Account(Base):
     __tablename__ = "accounts"
@@ -28,10 +37,17 @@ class Account(Base):
 class Tweet(Base):
     __tablename__ = "tweets"
 
-    id         = Column(Integer, primary_key=True, index=True)
+    id         = Column(Integer, primary_key=True, index=True, autoincrement=True)
     content    = Column(String, nullable=False)
     user_id    = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False,
+                        primary_key=TWEETS_PARTITIONED, index=True)
+
+    __table_args__ = (
+        # one author's tweets, newest first: profile timelines seek on it
+        Index("ix_tweets_user_created_id", "user_id", created_at.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (created_at)"} if TWEETS_PARTITIONED else {},
+    )
 
     # ─── Relationships ──────────────────────────────────────────────────────────
     user  = relationship(
@@ -42,13 +58,14 @@ class Tweet(Base):
         "Like",
         back_populates="tweet",
         cascade="all, delete-orphan",
+        primaryjoin="Tweet.id == foreign(Like.tweet_id)",
     )
 
 class Like(Base):
     __tablename__ = "likes"
 
     id         = Column(Integer, primary_key=True, index=True)
-    tweet_id   = Column(Integer, ForeignKey("tweets.id", ondelete="CASCADE"), nullable=False)
+    tweet_id   = Column(Integer, *_tweet_fk, nullable=False)
     user_id    = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -61,8 +78,55 @@ class Like(Base):
     tweet = relationship(
         "Tweet",
         back_populates="likes",
+        primaryjoin="Tweet.id == foreign(Like.tweet_id)",
     )
     user  = relationship(
         "Account",
         back_populates="likes",
     )
+
+class AccountStats(Base):
+    """
+    Profile header counters, updated by app.account_stats as tweets and
+    likes are written instead of being aggregated on every profile view.
+    """
+    __tablename__ = "account_stats"
+
+    account_id     = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True)
+    tweet_count    = Column(Integer, nullable=False, default=0)
+    likes_received = Column(Integer, nullable=False, default=0)
+    # there is no follow graph yet; stays 0 until follows are stored
+    followers      = Column(Integer, nullable=False, default=0)
+
+class TweetArchive(Base):
+    """
+    Cold storage for tweets moved out of the live table by the archiver.
+    No foreign keys: archived rows outlive their likes and may outlive
+    their author.
+    """
+    __tablename__ = "tweets_archive"
+
+    id          = Column(Integer, primary_key=True, autoincrement=False)
+    content     = Column(String, nullable=False)
+    user_id     = Column(Integer, nullable=False, index=True)
+    created_at  = Column(DateTime(timezone=True), nullable=False, index=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class OutboxEvent(Base):
+    """
+    Side effect of a write, recorded in the same transaction as the write
+    and applied later by the outbox relay (cache updates, fan-out, counters).
+    """
+    __tablename__ = "outbox"
+
+    id              = Column(Integer, primary_key=True, index=True)
+    kind            = Column(String, nullable=False)                 # e.g. "tweet.created"
+    aggregate_id    = Column(Integer, nullable=False)                # id of the row the event is about
+    payload         = Column(Text, nullable=False, default="{}")     # JSON
+    idempotency_key = Column(String, unique=True, nullable=False)
+    attempts        = Column(Integer, nullable=False, default=0)
+    last_error      = Column(String, nullable=True)
+    created_at      = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # not picked up before this time (retry backoff)
+    available_at    = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    processed_at    = Column(DateTime(timezone=True), nullable=True, index=True)
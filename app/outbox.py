@@ -0,0 +1,265 @@
+# app/outbox.py
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app import cache
+from app.database import SessionLocal
+from app.impressions import impressions
+from app.models import Account, OutboxEvent, Tweet
+from app.timeline_buffer import timeline_buffer
+from app.trending import trending
+from app.utils.settings import settings
+
+# how long a processed idempotency key is remembered in the cache
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+# processed events are deleted from the table after this long
+RETENTION = timedelta(days=1)
+# claimed events are hidden from other relays for this long
+LEASE = timedelta(seconds=60)
+
+def add_event(db: Session, kind: str, aggregate_id: int, **payload) -> OutboxEvent:
+    """
+    Record a side effect in the caller's transaction. Call before commit;
+    the event becomes visible to the relay exactly when the write does.
+    """
+    event = OutboxEvent(
+        kind=kind,
+        aggregate_id=aggregate_id,
+        payload=json.dumps(payload),
+        idempotency_key=uuid.uuid4().hex,
+    )
+    db.add(event)
+    return event
+
+# ─── Handlers ────────────────────────────────────────────────────────────────
+# {kind: [async handler(event, tweet)]}; `tweet` is the tweet's current
+# (id, content, user_id, created_at, username) row, or None if it no longer
+# exists, loaded once per batch.
+HANDLERS: dict = {}
+
+def handles(kind: str):
+    def register(fn):
+        HANDLERS.setdefault(kind, []).append(fn)
+        return fn
+    return register
+
+@handles("tweet.created")
+@handles("tweet.updated")
+async def _cache_tweet(event, tweet):
+    if tweet is None:
+        await cache.invalidate_tweet_cache(event.aggregate_id)
+    else:
+        await cache.set_tweet_cache(tweet)
+
+@handles("tweet.deleted")
+async def _uncache_tweet(event, tweet):
+    await cache.invalidate_tweet_cache(event.aggregate_id)
+
+@handles("tweet.created")
+async def _count_hashtags(event, tweet):
+    if tweet is not None:
+        trending.record(tweet.content)
+
+@handles("tweet.created")
+async def _fan_out_timeline(event, tweet):
+    if tweet is None:
+        return
+    event_json = timeline_buffer.add({
+        "id": tweet.id,
+        "content": tweet.content,
+        "created_at": tweet.created_at,
+        "username": tweet.username or "unknown",
+        "like_count": 0,
+        "liked_by_user": False,
+    })
+    await timeline_buffer.publish(event_json)
+
+@handles("tweet.deleted")
+async def _drop_impressions(event, tweet):
+    await impressions.forget(event.aggregate_id)
+
+@handles("tweet.updated")
+@handles("tweet.deleted")
+async def _invalidate_timeline(event, tweet):
+    await timeline_buffer.publish_invalidate(event.aggregate_id)
+
+# ─── Relay ───────────────────────────────────────────────────────────────────
+class OutboxRelay:
+    """
+    Reads pending outbox events in batches and applies their side effects.
+    Failed events are retried with exponential backoff up to `max_attempts`;
+    events that give up (dead letters) are kept for `dead_letter_days` for
+    inspection, then purged. Each handler's completion is remembered in the
+    cache under the event's idempotency key, so a redelivered event (crash
+    before it was marked processed, a retry after a partial failure, or two
+    relays racing on a database without SKIP LOCKED) re-runs only the
+    handlers that haven't succeeded yet.
+    """
+
+    def __init__(self, batch_size: int = 100, poll_seconds: float = 1.0, max_attempts: int = 10,
+                 dead_letter_days: float = 7):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.dead_letter_retention = timedelta(days=dead_letter_days)
+        self._task = None
+        self._running = False
+        self._loop = None
+        self._wakeup: asyncio.Event | None = None
+
+    def start(self):
+        """
+        Begin the relay loop. Called once during application startup.
+        """
+        if not self._running:
+            self._running = True
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the loop after the batch in progress, then drain what's left.
+        """
+        self._running = False
+        if self._task:
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.run_once()
+
+    def notify(self):
+        """
+        Wake the relay right after a commit instead of waiting for the next
+        poll. Safe to call from threadpool endpoints; no-op when not running.
+        """
+        if self._running and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        logging.info(f"OutboxRelay running: batches of {self.batch_size}, poll every {self.poll_seconds}s")
+        while self._running:
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logging.exception("Outbox relay pass failed")
+                processed = 0
+            if processed < self.batch_size:
+                # caught up: sleep until notified or the next poll
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    # ─── DB work (runs in a thread) ──────────────────────────────────────────
+    def _claim(self) -> tuple[list[OutboxEvent], dict]:
+        now = datetime.now(timezone.utc)
+        session = SessionLocal()
+        try:
+            events = (
+                session.query(OutboxEvent)
+                .filter(
+                    OutboxEvent.processed_at.is_(None),
+                    OutboxEvent.attempts < self.max_attempts,
+                    OutboxEvent.available_at <= now,
+                )
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                # Postgres: concurrent relays take disjoint batches
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if events:
+                # lease the batch so other relays skip it while we apply it;
+                # success or failure overwrites the lease in _record
+                session.query(OutboxEvent).filter(OutboxEvent.id.in_([e.id for e in events])).update(
+                    {OutboxEvent.available_at: now + LEASE}, synchronize_session=False
+                )
+            tweet_ids = {e.aggregate_id for e in events if e.kind.startswith("tweet.")}
+            rows = (
+                session.query(Tweet.id, Tweet.content, Tweet.user_id, Tweet.created_at, Account.username)
+                .outerjoin(Account, Account.id == Tweet.user_id)
+                .filter(Tweet.id.in_(tweet_ids))
+                .all()
+            ) if tweet_ids else []
+            session.expunge_all()
+            session.commit()
+            return events, {r.id: r for r in rows}
+        finally:
+            session.close()
+
+    def _record(self, done: list[int], failed: list[tuple[int, int, str]]) -> None:
+        now = datetime.now(timezone.utc)
+        session = SessionLocal()
+        try:
+            if done:
+                session.query(OutboxEvent).filter(OutboxEvent.id.in_(done)).update(
+                    {OutboxEvent.processed_at: now}, synchronize_session=False
+                )
+            for event_id, attempts, error in failed:
+                session.query(OutboxEvent).filter(OutboxEvent.id == event_id).update({
+                    OutboxEvent.attempts: attempts,
+                    OutboxEvent.last_error: error[:500],
+                    OutboxEvent.available_at: now + timedelta(seconds=min(300, 2 ** attempts)),
+                }, synchronize_session=False)
+                if attempts >= self.max_attempts:
+                    logging.error(f"Outbox event {event_id} gave up after {attempts} attempts: {error}")
+            session.query(OutboxEvent).filter(
+                OutboxEvent.processed_at < now - RETENTION
+            ).delete(synchronize_session=False)
+            purged = session.query(OutboxEvent).filter(
+                OutboxEvent.processed_at.is_(None),
+                OutboxEvent.attempts >= self.max_attempts,
+                OutboxEvent.created_at < now - self.dead_letter_retention,
+            ).delete(synchronize_session=False)
+            session.commit()
+            if purged:
+                logging.warning(f"Purged {purged} dead-letter outbox events older than {self.dead_letter_retention}")
+        finally:
+            session.close()
+
+    # ─── one pass ────────────────────────────────────────────────────────────
+    async def _apply(self, event: OutboxEvent, tweet) -> None:
+        backend = cache.backend
+        for handler in HANDLERS.get(event.kind, ()):
+            # per handler: a retry must not recount hashtags or re-publish
+            # to timelines because a later handler failed
+            key = f"outbox:done:{event.idempotency_key}:{handler.__name__}"
+            if backend is not None and await backend.exists(key):
+                continue
+            await handler(event, tweet)
+            if backend is not None:
+                await backend.set(key, "1", ex=IDEMPOTENCY_TTL_SECONDS)
+
+    async def run_once(self) -> int:
+        """
+        Claim and apply one batch. Returns the number of events handled.
+        """
+        events, tweets = await asyncio.to_thread(self._claim)
+        if not events:
+            return 0
+        done, failed = [], []
+        for event in events:
+            try:
+                await self._apply(event, tweets.get(event.aggregate_id))
+                done.append(event.id)
+            except Exception as e:
+                logging.exception(f"Outbox event {event.id} ({event.kind}) failed")
+                failed.append((event.id, event.attempts + 1, repr(e)))
+        await asyncio.to_thread(self._record, done, failed)
+        return len(events)
+
+# singleton relay, started on app startup
+outbox_relay = OutboxRelay(
+    batch_size=settings.outbox_batch_size,
+    poll_seconds=settings.outbox_poll_seconds,
+    max_attempts=settings.outbox_max_attempts,
+    dead_letter_days=settings.outbox_dead_letter_days,
+)
@@ -0,0 +1,108 @@
+# app/partitions.py
+
+import logging
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.models import TWEETS_PARTITIONED
+
+# TWEETS_PARTITIONED only shapes tables create_all makes from scratch; an
+# existing tweets table is left as it is. To convert one, with the app
+# stopped, move it aside (its index names too, so create_all can reuse them):
+#
+#   ALTER TABLE tweets RENAME TO tweets_heap;
+#   DO $$ DECLARE r record; BEGIN
+#     FOR r IN SELECT indexname FROM pg_indexes WHERE tablename = 'tweets_heap' LOOP
+#       EXECUTE format('ALTER INDEX %I RENAME TO %I', r.indexname, r.indexname || '_heap');
+#     END LOOP;
+#   END $$;
+#
+# start the app once with TWEETS_PARTITIONED=true (startup rebuilds likes
+# without the foreign key and creates the partitioned table and its
+# partitions), stop it, then copy the rows over:
+#
+#   INSERT INTO tweets (id, content, user_id, created_at)
+#     SELECT id, content, user_id, created_at FROM tweets_heap;
+#   SELECT setval(pg_get_serial_sequence('tweets', 'id'), max(id)) FROM tweets;
+#   DROP TABLE tweets_heap;
+#
+# Until then partition maintenance logs an error and skips.
+
+# monthly partitions are named tweets_YYYY_MM
+PARTITION_RE = re.compile(r"^tweets_(\d{4})_(\d{2})$")
+
+def _add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+def partition_name(month: date) -> str:
+    return f"tweets_{month.year:04d}_{month.month:02d}"
+
+def partition_bounds(name: str) -> tuple[date, date] | None:
+    """
+    Return the [start, end) month range covered by a partition name.
+    """
+    m = PARTITION_RE.match(name)
+    if not m:
+        return None
+    start = date(int(m.group(1)), int(m.group(2)), 1)
+    return start, _add_months(start, 1)
+
+def ensure_tweet_partitions(months_back: int = 1, months_ahead: int = 3) -> list[str]:
+    """
+    Create the monthly partitions around the current month plus a DEFAULT
+    partition that catches anything outside them. Safe to call repeatedly;
+    meant to run on startup and then periodically so next month's partition
+    always exists before the first tweet lands in it.
+    No-op unless the tweets table is partitioned.
+    """
+    if not TWEETS_PARTITIONED:
+        return []
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    created = []
+    with engine.begin() as conn:
+        if not tweets_is_partitioned(conn):
+            # create_all leaves an existing tweets table as it is; turning the
+            # flag on doesn't convert it
+            logging.error(
+                "TWEETS_PARTITIONED is set but the existing tweets table is not "
+                "partitioned; skipping partition maintenance. Migrate the table "
+                "(see app/partitions.py) or unset TWEETS_PARTITIONED."
+            )
+            return []
+        for n in range(-months_back, months_ahead + 1):
+            start = _add_months(this_month, n)
+            name = partition_name(start)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF tweets "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{_add_months(start, 1).isoformat()}')"
+            ))
+            created.append(name)
+        conn.execute(text("CREATE TABLE IF NOT EXISTS tweets_default PARTITION OF tweets DEFAULT"))
+    logging.info(f"Tweet partitions ensured: {created[0]} .. {created[-1]}")
+    return created
+
+def tweets_is_partitioned(conn) -> bool:
+    """
+    Whether the tweets table in the database is actually partitioned.
+    """
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'tweets'"
+    )).first() is not None
+
+def list_tweet_partitions(conn) -> list[str]:
+    """
+    Names of the monthly partitions currently attached to tweets, oldest first.
+    """
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'tweets'"
+    )).scalars().all()
+    return sorted(name for name in rows if PARTITION_RE.match(name))
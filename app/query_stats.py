@@ -0,0 +1,194 @@
+# app/query_stats.py
+
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.settings import settings
+
+logger = logging.getLogger("app.queries")
+
+class QueryStats:
+    """
+    Queries executed while tracking is active: count, total DB time and how
+    often each distinct SQL statement ran (to spot N+1 patterns).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements: Counter[str] = Counter()
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """
+        Statements run at least `threshold` times, most frequent first.
+        """
+        return [(s, n) for s, n in self.statements.most_common() if n >= threshold]
+
+# stats of the request (or test block) currently executing; the object is
+# shared with threadpool workers because contextvars are copied by reference
+_current: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    stats.count += 1
+    stats.total_time += time.perf_counter() - conn.info["query_start"].pop()
+    stats.statements[statement] += 1
+
+@contextmanager
+def track_queries():
+    """
+    Collect QueryStats for every query run inside the block.
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def assert_max_queries(n: int):
+    """
+    Test helper: fail if the block runs more than `n` SQL statements.
+
+        with assert_max_queries(2):
+            client.get("/api/tweets/")
+    """
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= n, (
+        f"Expected at most {n} queries, got {stats.count}:\n"
+        + "\n".join(f"  {c}x {s}" for s, c in stats.statements.most_common())
+    )
+
+# ─── On-demand profiling ─────────────────────────────────────────────────────
+# Starlette runs sync endpoints and dependencies on these threads; background
+# work sent to asyncio.to_thread (outbox relay, scheduler jobs) runs on
+# "asyncio_N" threads instead
+REQUEST_THREAD_NAME = "AnyIO worker thread"
+
+class StackSampler:
+    """
+    Samples Python stacks every `interval` seconds and aggregates them in
+    collapsed ("folded") format, which flamegraph.pl, speedscope and
+    similar tools read directly. By default every other thread is sampled;
+    with `requests_only` just the thread that called start() (the event
+    loop) and the request threadpool, i.e. every request in flight on this
+    worker, not only the one that asked for the profile.
+    """
+
+    def __init__(self, interval: float = 0.005, requests_only: bool = False):
+        self.interval = interval
+        self.requests_only = requests_only
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._loop_thread = None
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _sampled_threads(self) -> set[int] | None:
+        if not self.requests_only:
+            return None
+        return {self._loop_thread} | {
+            t.ident for t in threading.enumerate() if t.name.startswith(REQUEST_THREAD_NAME)
+        }
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.is_set():
+            wanted = self._sampled_threads()
+            for tid, frame in sys._current_frames().items():
+                if tid != own and (wanted is None or tid in wanted):
+                    self.samples[self._collapse(frame)] += 1
+            time.sleep(self.interval)
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._thread.start()
+
+    def stop(self) -> str:
+        """
+        Stop sampling and return the folded stacks.
+        """
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{stack} {n}" for stack, n in self.samples.most_common()) + "\n"
+
+def _save_profile(path: str, folded: str) -> str:
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    name = f"{int(time.time() * 1000)}-{path.strip('/').replace('/', '_') or 'root'}.folded"
+    with open(os.path.join(settings.profile_dir, name), "w") as f:
+        f.write(folded)
+    return name
+
+def profiling_requested(request) -> bool:
+    """
+    True if the request carries the operator profiling token.
+    """
+    if not settings.profile_token:
+        return False
+    given = request.headers.get("x-profile", "").encode("utf-8")
+    return hmac.compare_digest(given, settings.profile_token.encode("utf-8"))
+
+# ─── Middleware ──────────────────────────────────────────────────────────────
+async def query_stats_middleware(request, call_next):
+    """
+    Count queries and DB time per request, add a Server-Timing header, warn
+    about N+1 patterns and budget overruns, and optionally capture a
+    sampling profile when the X-Profile header matches PROFILE_TOKEN. The
+    profile covers this worker's request threads while the request runs,
+    so concurrent requests show up in it too; background threads don't.
+    """
+    sampler = None
+    if profiling_requested(request):
+        sampler = StackSampler(requests_only=True)
+        sampler.start()
+
+    started = time.perf_counter()
+    try:
+        with track_queries() as stats:
+            response = await call_next(request)
+    finally:
+        folded = sampler.stop() if sampler is not None else None
+    elapsed = time.perf_counter() - started
+
+    response.headers.append(
+        "Server-Timing",
+        f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries", '
+        f"app;dur={elapsed * 1000:.1f}",
+    )
+    path = request.url.path
+    for statement, n in stats.repeated(settings.n_plus_one_threshold):
+        logger.warning(f"Possible N+1 on {request.method} {path}: {n}x {statement}")
+    if stats.count > settings.query_budget:
+        logger.warning(f"Query budget exceeded on {request.method} {path}: {stats.count} > {settings.query_budget}")
+
+    if folded is not None:
+        response.headers["X-Profile-Dump"] = _save_profile(path, folded)
+    return response
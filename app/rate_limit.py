@@ -0,0 +1,179 @@
+# app/rate_limit.py
+
+import logging
+import math
+import threading
+import time
+
+from fastapi import HTTPException, Request, status
+
+from app import cache
+from app.utils.settings import settings
+
+# Atomic token bucket. Uses the Redis clock so every worker agrees on "now".
+# ARGV: capacity, refill rate (tokens/s), cost, force (1 = always deduct,
+# used to replay consumption that was already allowed locally).
+# Returns {allowed, retry_after_seconds, tokens_left} (floats as strings).
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate     = tonumber(ARGV[2])
+local cost     = tonumber(ARGV[3])
+local force    = tonumber(ARGV[4])
+local t   = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state  = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts     = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry   = 0
+if tokens >= cost or force == 1 then
+  tokens  = tokens - cost
+  allowed = 1
+else
+  retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry), tostring(tokens)}
+"""
+
+class _Bucket:
+    """
+    In-process token bucket; `used` counts tokens consumed since the last
+    sync with Redis.
+    """
+    __slots__ = ("tokens", "ts", "used")
+
+    def __init__(self, tokens: float, ts: float):
+        self.tokens = tokens
+        self.ts = ts
+        self.used = 0
+
+class RateLimiter:
+    """
+    Token-bucket limiter with two modes:
+
+    - "redis": every check runs the Lua script (exact, one round trip).
+    - "local": checks run against in-process buckets and the consumed
+      tokens are pushed to Redis in one pipelined batch every
+      `sync_interval` seconds; each sync pulls back the shared balance,
+      so workers converge on the cluster-wide quota.
+
+    Without a Redis client both modes degrade to per-worker buckets.
+    """
+
+    def __init__(self, mode: str = "local", sync_interval: float = 1.0):
+        self.mode = mode
+        self.sync_interval = sync_interval
+        # {key: (_Bucket, capacity, rate)}; guarded by a threading lock since
+        # sync endpoints and async dependencies share the limiter
+        self._buckets: dict[str, tuple[_Bucket, int, float]] = {}
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        self._script = None
+        self._script_client = None
+
+    def _lua(self):
+        # re-register if init_cache swapped the client
+        if self._script_client is not cache.redis_client:
+            self._script = cache.redis_client.register_script(TOKEN_BUCKET_LUA)
+            self._script_client = cache.redis_client
+        return self._script
+
+    def _take_local(self, key: str, capacity: int, rate: float, cost: int = 1) -> float:
+        """
+        Consume from the local bucket. Returns 0 if allowed, otherwise the
+        number of seconds until enough tokens are available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is None:
+                bucket = _Bucket(capacity, now)
+                self._buckets[key] = (bucket, capacity, rate)
+            else:
+                bucket = entry[0]
+            bucket.tokens = min(capacity, bucket.tokens + (now - bucket.ts) * rate)
+            bucket.ts = now
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                bucket.used += cost
+                return 0.0
+            return (cost - bucket.tokens) / rate
+
+    async def sync(self) -> None:
+        """
+        Push locally consumed tokens to Redis and adopt the shared balances.
+        Idle, full buckets are dropped so memory tracks active clients only.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._last_sync = now
+            dirty = [(k, b, c, r, b.used) for k, (b, c, r) in self._buckets.items() if b.used]
+            for k in [k for k, (b, c, r) in self._buckets.items()
+                      if not b.used and b.tokens + (now - b.ts) * r >= c]:
+                del self._buckets[k]
+        if not dirty or cache.redis_client is None:
+            return
+        script = self._lua()
+        try:
+            async with cache.redis_client.pipeline(transaction=False) as pipe:
+                for key, bucket, capacity, rate, used in dirty:
+                    await script(keys=[key], args=[capacity, rate, used, 1], client=pipe)
+                results = await pipe.execute()
+        except Exception:
+            logging.exception("Rate limiter sync to Redis failed")
+            return
+        with self._lock:
+            for (key, bucket, capacity, rate, used), (_, _, tokens) in zip(dirty, results):
+                # usage recorded while the pipeline was in flight goes next round
+                bucket.used -= used
+                bucket.tokens = min(bucket.tokens, float(tokens) - bucket.used)
+
+    async def hit(self, key: str, capacity: int, rate: float) -> float:
+        """
+        Charge one request to `key`. Returns 0 if allowed, else Retry-After seconds.
+        """
+        if self.mode == "redis" and cache.redis_client is not None:
+            try:
+                allowed, retry, _ = await self._lua()(keys=[key], args=[capacity, rate, 1, 0])
+                return 0.0 if int(allowed) else float(retry)
+            except Exception:
+                # never fail a request because the limiter's store is down
+                logging.exception("Redis rate limit check failed; using local bucket")
+        retry = self._take_local(key, capacity, rate)
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            await self.sync()
+        return retry
+
+limiter = RateLimiter(mode=settings.rate_limit_mode, sync_interval=settings.rate_limit_sync_seconds)
+
+def _reject(retry: float):
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Rate limit exceeded",
+        headers={"Retry-After": str(max(1, math.ceil(retry)))},
+    )
+
+class RateLimit:
+    """
+    FastAPI dependency allowing `limit` requests per `per` seconds (with a
+    burst of `limit`) for each client IP on the given route scope.
+    """
+
+    def __init__(self, scope: str, limit: int, per: float):
+        self.scope = scope
+        self.capacity = limit
+        self.rate = limit / per
+
+    async def check(self, key: str) -> None:
+        if not settings.rate_limit_enabled:
+            return
+        retry = await limiter.hit(f"rl:{self.scope}:{key}", self.capacity, self.rate)
+        if retry:
+            _reject(retry)
+
+    async def __call__(self, request: Request) -> None:
+        ip = request.client.host if request.client else "unknown"
+        await self.check(f"ip:{ip}")
@@ -1,14 +1,21 @@
 # app/routers/accounts.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Form
+import base64
+import binascii
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Form
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app import account_stats, crud
+from app.database import get_db, get_read_db
+from app.impressions import impressions, viewer_id
 from app.models import Account
-from app.schemas import AccountCreate, AccountOut, Token
+from app.rate_limit import RateLimit
+from app.schemas import AccountCreate, AccountOut, ProfileTimeline, Token
 from app.utils.auth import get_current_user
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(tags=["accounts"])  # no internal prefix
 
@@ -17,6 +24,7 @@ router = APIRouter(tags=["accounts"])  # no internal prefix
     response_model=AccountOut,
     status_code=status.HTTP_201_CREATED,
     summary="Register a new account",
+    dependencies=[Depends(RateLimit("register_account", limit=5, per=3600))],
 )
 def register_account(
     account_in: AccountCreate,
@@ -84,11 +92,75 @@ def login_account(
     summary="List all user accounts",
 )
 def list_accounts(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Return every account (for admin/testing).
     """
     return db.query(Account).order_by(Account.created_at.desc()).all()
 def read_current_user(current: Account = Depends(get_current_user)):
-    return current
\ No newline at end of file
+    return current
+
+# ─── Profile timeline ────────────────────────────────────────────────────────
+def _encode_cursor(created_at: datetime, tweet_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{tweet_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, tweet_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(tweet_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+@router.get(
+    "/{username}/tweets",
+    response_model=ProfileTimeline,
+    summary="A user's profile header and tweets, newest first",
+)
+def list_account_tweets(
+    username: str,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Cursor-paginated tweets of one user plus the profile counters, which
+    are read from a maintained row rather than aggregated per view.
+    """
+    account = crud.get_account_by_username(db, username)
+    if account is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found",
+        )
+    before = _decode_cursor(cursor) if cursor else None
+    # one extra row tells us whether there is a next page
+    rows = crud.get_account_tweets(db, account.id, limit=limit + 1, before=before)
+    page = rows[:limit]
+    impressions.record(viewer_id(request), [t.id for t in page])
+    last = page[-1] if len(rows) > limit else None
+    return {
+        "profile": {
+            "username": account.username,
+            "created_at": account.created_at,
+            **account_stats.get_stats(db, account.id),
+        },
+        "tweets": [
+            {
+                "id": t.id,
+                "content": t.content,
+                "created_at": t.created_at,
+                "username": account.username,
+                "like_count": 0,
+                "liked_by_user": False,
+            }
+            for t in page
+        ],
+        "next_cursor": _encode_cursor(last.created_at, last.id) if last else None,
+    }
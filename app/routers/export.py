@@ -0,0 +1,70 @@
+# app/routers/export.py
+
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.database import ReadSessionLocal
+from app.export import EXPORTERS, gzip_stream, iter_ndjson
+from app.utils.settings import settings
+
+router = APIRouter(tags=["export"])
+
+def require_export_token(x_export_token: str = Header("")):
+    """
+    Exports include every account's email, so they need the operator token
+    rather than a user login. Disabled while EXPORT_TOKEN is empty.
+    """
+    expected = settings.export_token
+    if not expected or not hmac.compare_digest(x_export_token.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="A valid X-Export-Token header is required",
+        )
+
+def _stream(table: str, since_id: int):
+    """
+    Own the session for the whole stream: yield-dependencies are torn down
+    before a StreamingResponse body is sent, so get_db can't be used here.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield from iter_ndjson(db, table, since_id)
+    finally:
+        db.close()
+
+@router.get(
+    "/{table}",
+    summary="Stream a table as NDJSON",
+    response_class=StreamingResponse,
+)
+def export_table(
+    table: str,
+    since_id: int = Query(0, ge=0, description="Only export rows with id > since_id"),
+    gzip: bool = Query(False, description="Download a gzip file (.ndjson.gz) instead"),
+    _: None = Depends(require_export_token),
+):
+    """
+    Stream every row of `tweets` or `accounts` in id order, one JSON object
+    per line. Memory use is constant; resume with the last id received.
+    With gzip the body is the .gz file itself (no Content-Encoding), so
+    clients save it as is instead of transparently decompressing it.
+    """
+    if table not in EXPORTERS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export table '{table}'",
+        )
+    body = _stream(table, since_id)
+    if gzip:
+        return StreamingResponse(
+            gzip_stream(body),
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{table}.ndjson.gz"'},
+        )
+    return StreamingResponse(
+        body,
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{table}.ndjson"'},
+    )
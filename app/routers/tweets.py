@@ -1,42 +1,213 @@
 # app/routers/tweets.py
 
-from typing import List
-from fastapi import APIRouter, Depends, status
+import logging
+from typing import List, Literal
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app import cache, crud
+from app.database import get_db, get_read_db
+from app.impressions import impressions, viewer_id
 from app.models import Tweet, Account
-from app.schemas import TweetCreate, TweetOut
+from app.outbox import outbox_relay
+from app.rate_limit import RateLimit
+from app.schemas import TweetBatchItem, TweetCreate, TweetOut, TweetStats, TrendingTag
+from app.timeline_buffer import timeline_buffer
+from app.trending import trending
 from app.utils.auth import get_current_user
 
 router = APIRouter(tags=["tweets"])
 
+# upper bound on ids per /batch request
+MAX_BATCH_IDS = 100
+
+def _newest_tweets(db: Session, skip: int, limit: int) -> list[dict]:
+    # one joined query instead of an author lookup per tweet
+    raw = (
+        db.query(Tweet, Account.username)
+        .outerjoin(Account, Account.id == Tweet.user_id)
+        .order_by(Tweet.created_at.desc(), Tweet.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "id": t.id,
+            "content": t.content,
+            "created_at": t.created_at,
+            "username": username or "unknown",
+            "like_count": 0,
+            "liked_by_user": False,
+        }
+        for t, username in raw
+    ]
+
+def _on_loop(fn, *args):
+    # sync endpoints run in a worker thread; the cache client lives on the loop
+    try:
+        return anyio.from_thread.run(fn, *args)
+    except Exception:
+        logging.warning("Timeline head cache unavailable", exc_info=True)
+        return None
+
+def _prime_timeline(db: Session) -> None:
+    """
+    Prime this worker's timeline buffer from the head another worker shared
+    through the cache if there is one, else from the database (and share
+    the result), so workers re-priming together cost one query, not N.
+    """
+    shared = cache.backend is not None and cache.backend.shared
+    head = _on_loop(cache.get_timeline_head) if shared else None
+    if head is not None:
+        timeline_buffer.prime_rendered(head)
+        return
+    timeline_buffer.prime(_newest_tweets(db, 0, timeline_buffer.capacity))
+    if shared:
+        _on_loop(cache.set_timeline_head, timeline_buffer.snapshot())
+
 @router.get(
     "/",
     response_model=List[TweetOut],
     summary="List tweets (likes disabled)",
 )
 def list_tweets(
-    db: Session = Depends(get_db),
-    current: Account = Depends(get_current_user),
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=200),
+    db: Session = Depends(get_read_db),
 ):
     """
-    Return all tweets with author username.
+    Return the newest tweets with author username, newest first.
+    Pages inside the per-worker timeline buffer are served straight from
+    memory; deeper pages query the database.
     like_count and liked_by_user are always 0/False for now.
     """
-    raw = db.query(Tweet).order_by(Tweet.created_at.desc()).all()
-    result = []
-    for t in raw:
-        author = db.query(Account).get(t.user_id)
-        result.append({
+    cached = timeline_buffer.page(skip, limit)
+    if cached is None and not timeline_buffer.ready:
+        _prime_timeline(db)
+        cached = timeline_buffer.page(skip, limit)
+    if cached is not None:
+        ids, body = cached
+        impressions.record(viewer_id(request), ids)
+        return Response(content=body, media_type="application/json")
+    tweets = _newest_tweets(db, skip, limit)
+    impressions.record(viewer_id(request), [t["id"] for t in tweets])
+    return tweets
+
+
+@router.get(
+    "/search",
+    response_model=List[TweetOut],
+    summary="Search tweets by keyword",
+)
+def search_tweets(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(50, ge=1, le=200),
+    include_archive: bool = Query(False, description="Also search archived (cold) tweets"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Recent tweets are searched first; archived tweets only on request.
+    """
+    found = crud.search_tweets(db, q, limit=limit, include_archive=include_archive)
+    user_ids = {t.user_id for t in found}
+    names = dict(
+        db.query(Account.id, Account.username).filter(Account.id.in_(user_ids)).all()
+    ) if user_ids else {}
+    return [
+        {
             "id": t.id,
             "content": t.content,
             "created_at": t.created_at,
-            "username": author.username if author else "unknown",
+            "username": names.get(t.user_id, "unknown"),
             "like_count": 0,
             "liked_by_user": False,
-        })
-    return result
+        }
+        for t in found
+    ]
+
+
+def _parse_ids(ids: str) -> list[int]:
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be comma-separated integers",
+        )
+    if not parsed or len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"between 1 and {MAX_BATCH_IDS} ids per request",
+        )
+    return parsed
+
+# declared before any "/{id}" route so "batch" isn't taken for an id
+@router.get(
+    "/batch",
+    response_model=List[TweetBatchItem],
+    summary="Fetch many tweets by id",
+)
+async def get_tweets_batch(
+    request: Request,
+    ids: str = Query(..., description=f"Comma-separated tweet ids, at most {MAX_BATCH_IDS}"),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Resolve the ids from the cache in one round trip, load the misses in a
+    single query and back-fill the cache with them. Results follow the
+    request order (duplicates included); unknown ids come back found=false.
+    """
+    wanted = _parse_ids(ids)
+    unique = list(dict.fromkeys(wanted))
+    # entries in the legacy layout carry no username; reload (and upgrade) them
+    found = {
+        tweet_id: tweet
+        for tweet_id, tweet in (await cache.get_tweets_cache(unique)).items()
+        if tweet["username"]
+    }
+    missing = [tweet_id for tweet_id in unique if tweet_id not in found]
+    if missing:
+        rows = await run_in_threadpool(crud.get_tweets_by_ids, db, missing)
+        if rows:
+            await cache.set_tweets_cache(rows)
+        found.update((row.id, row._asdict()) for row in rows)
+    impressions.record(viewer_id(request), found)
+    return [
+        {
+            "id": tweet_id,
+            "found": tweet_id in found,
+            "tweet": {
+                "id": tweet_id,
+                "content": found[tweet_id]["content"],
+                "created_at": found[tweet_id]["created_at"],
+                "username": found[tweet_id]["username"] or "unknown",
+                "like_count": 0,
+                "liked_by_user": False,
+            } if tweet_id in found else None,
+        }
+        for tweet_id in wanted
+    ]
+
+
+@router.get(
+    "/{tweet_id}/stats",
+    response_model=TweetStats,
+    summary="Impressions and unique viewers of a tweet",
+)
+async def tweet_stats(tweet_id: int, db: Session = Depends(get_read_db)):
+    """
+    Times the tweet was served by the timeline endpoints, and roughly how
+    many distinct viewers saw it (HyperLogLog, ~1% error). Counts are
+    written in batches, so the last couple of seconds may be missing.
+    """
+    if await run_in_threadpool(crud.get_tweet, db, tweet_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tweet not found")
+    return await impressions.stats(tweet_id)
 
 
 @router.post(
@@ -44,16 +215,27 @@ def list_tweets(
     response_model=TweetOut,
     status_code=status.HTTP_201_CREATED,
     summary="Create a new tweet",
+    # per IP only: get_current_user doesn't resolve the caller's account
+    # yet, so a per-user key would be one bucket shared by everyone
+    dependencies=[Depends(RateLimit("create_tweet", limit=30, per=60))],
 )
 def create_tweet(
     tweet_in: TweetCreate,
     db: Session = Depends(get_db),
     current: Account = Depends(get_current_user),
 ):
-    new_t = Tweet(content=tweet_in.content, user_id=current.id)
-    db.add(new_t)
-    db.commit()
-    db.refresh(new_t)
+    new_t = crud.create_tweet(db, tweet_in, current.id)
+    # this worker's timeline head is updated right away for read-your-writes;
+    # cache, hashtag counts and cross-worker fan-out go through the outbox
+    timeline_buffer.add({
+        "id": new_t.id,
+        "content": new_t.content,
+        "created_at": new_t.created_at,
+        "username": current.username,
+        "like_count": 0,
+        "liked_by_user": False,
+    })
+    outbox_relay.notify()
     return {
         "id": new_t.id,
         "content": new_t.content,
@@ -62,3 +244,19 @@ def create_tweet(
         "like_count": 2,
         "liked_by_user": False,
     }
+
+
+@router.get(
+    "/trending",
+    response_model=List[TrendingTag],
+    summary="Top hashtags over a rolling window",
+)
+async def trending_hashtags(
+    window: Literal["1h", "24h"] = "1h",
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Served from time-bucketed counters maintained at tweet-create time;
+    never scans the tweets table.
+    """
+    return await trending.top(window, limit)
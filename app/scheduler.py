@@ -0,0 +1,247 @@
+# app/scheduler.py
+
+import asyncio
+import inspect
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+
+from app import cache
+from app.utils.settings import settings
+
+# Extend / drop the lease only while we still hold it (value = our node id).
+# ARGV: node id, lease in ms.
+RENEW_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class LeaderElection:
+    """
+    At most one leader per cluster, held as a Redis lease: SET NX PX to
+    take it, a compare-and-PEXPIRE script to renew it, compare-and-DEL to
+    hand it back. A leader only trusts its lease until the expiry it last
+    obtained, so one that can't reach Redis stops leading before another
+    worker can take over. A job that can outlast the lease must check
+    `is_leader` between units of work (see TweetArchiver.run_once);
+    a run in flight is not interrupted. Without Redis (embedded cache)
+    every process leads itself.
+    """
+
+    def __init__(self, key: str = "scheduler:leader", lease_seconds: float = 15.0):
+        self.key = key
+        self.lease_seconds = lease_seconds
+        self.node = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        # monotonic time our lease is known to be valid until
+        self._lease_until = 0.0
+        self._held = False
+
+    @property
+    def is_leader(self) -> bool:
+        return self._held and time.monotonic() < self._lease_until
+
+    async def refresh(self) -> bool:
+        """
+        Renew the lease if we hold it, else try to take it. Returns whether
+        this node leads now.
+        """
+        client = cache.redis_client
+        started = time.monotonic()
+        if client is None:
+            held = True
+        else:
+            ms = int(self.lease_seconds * 1000)
+            try:
+                held = bool(await client.eval(RENEW_LUA, 1, self.key, self.node, ms)) or bool(
+                    await client.set(self.key, self.node, nx=True, px=ms)
+                )
+            except Exception:
+                logging.exception("Leader election failed; not leading until it succeeds")
+                held = False
+        if held != self._held:
+            logging.info(f"Scheduler node {self.node} {'is now' if held else 'is no longer'} the leader")
+        self._held = held
+        self._lease_until = started + self.lease_seconds if held else 0.0
+        return held
+
+    async def release(self) -> None:
+        client = cache.redis_client
+        if self._held and client is not None:
+            try:
+                await client.eval(RELEASE_LUA, 1, self.key, self.node)
+            except Exception:
+                logging.exception("Failed to release scheduler leadership")
+        self._held = False
+        self._lease_until = 0.0
+
+class Job:
+    """
+    A periodic task plus its runtime metrics. Coroutine functions run on
+    the loop; plain functions (blocking DB work) run in a thread.
+    """
+
+    def __init__(self, name: str, fn, interval: float, jitter: float = 0.1,
+                 leader_only: bool = True, run_on_shutdown: bool = False):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        # each delay is interval ± jitter * interval
+        self.jitter = jitter
+        # cluster-wide work runs on the leader only; per-worker work everywhere
+        self.leader_only = leader_only
+        # run once more while draining (e.g. flush in-memory buffers)
+        self.run_on_shutdown = run_on_shutdown
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.running = False
+        self.last_started: float | None = None
+        self.last_seconds: float | None = None
+        self.max_seconds = 0.0
+        self.total_seconds = 0.0
+        self.last_error: str | None = None
+
+    def next_delay(self) -> float:
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    async def run(self) -> None:
+        self.running = True
+        self.last_started = time.time()
+        t0 = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(self.fn):
+                await self.fn()
+            else:
+                await asyncio.to_thread(self.fn)
+            self.last_error = None
+        except Exception as e:
+            self.failures += 1
+            self.last_error = repr(e)
+            logging.exception(f"Scheduled job {self.name} failed")
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.runs += 1
+            self.last_seconds = elapsed
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+            self.running = False
+
+    def metrics(self) -> dict:
+        return {
+            "interval": self.interval,
+            "leader_only": self.leader_only,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started": self.last_started,
+            "last_seconds": self.last_seconds,
+            "avg_seconds": self.total_seconds / self.runs if self.runs else None,
+            "max_seconds": self.max_seconds,
+            "last_error": self.last_error,
+        }
+
+class Scheduler:
+    """
+    Runs registered jobs, each on its own loop with a jittered delay so
+    workers and jobs don't fire in lockstep. Leader-only jobs are skipped
+    on followers. Shutdown stops scheduling, lets runs in progress finish
+    (up to `drain_seconds`), runs the run_on_shutdown jobs once more and
+    gives up leadership.
+    """
+
+    def __init__(self, election: LeaderElection, drain_seconds: float = 30.0):
+        self.election = election
+        self.drain_seconds = drain_seconds
+        self.jobs: dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+        self._stopping: asyncio.Event | None = None
+
+    def add(self, name: str, fn, interval: float, **options) -> Job:
+        """
+        Register a job (see Job for options). Call before start().
+        """
+        if name in self.jobs:
+            raise ValueError(f"job {name!r} already registered")
+        job = self.jobs[name] = Job(name, fn, interval, **options)
+        return job
+
+    def start(self) -> None:
+        """
+        Begin leader election and every job loop. Called once on startup.
+        """
+        if self._tasks:
+            return
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._elect())]
+        self._tasks += [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+        logging.info(f"Scheduler started with {len(self.jobs)} jobs on node {self.election.node}")
+
+    async def _sleep(self, seconds: float) -> bool:
+        # True once shutdown has begun
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _elect(self) -> None:
+        while True:
+            await self.election.refresh()
+            # renew well before the lease runs out
+            if await self._sleep(self.election.lease_seconds / 3):
+                return
+
+    async def _loop(self, job: Job) -> None:
+        # a random first delay spreads jobs registered together
+        delay = random.uniform(0, job.interval)
+        while not await self._sleep(delay):
+            if job.leader_only and not self.election.is_leader:
+                job.skipped += 1
+            else:
+                await job.run()
+            delay = job.next_delay()
+
+    async def stop(self) -> None:
+        """
+        Drain: no new runs, wait for the ones in progress, final runs, release.
+        """
+        if not self._tasks:
+            return
+        self._stopping.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=self.drain_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            busy = [job.name for job in self.jobs.values() if job.running]
+            logging.warning(f"Scheduler drain timed out; cancelled {busy}")
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+        for job in self.jobs.values():
+            if job.run_on_shutdown:
+                await job.run()
+        await self.election.release()
+
+    def metrics(self) -> dict:
+        return {
+            "node": self.election.node,
+            "leader": self.election.is_leader,
+            "jobs": {name: job.metrics() for name, job in self.jobs.items()},
+        }
+
+# singleton scheduler; jobs are registered by app.jobs on startup
+scheduler = Scheduler(
+    LeaderElection(lease_seconds=settings.scheduler_lease_seconds),
+    drain_seconds=settings.scheduler_drain_seconds,
+)
@@ -45,4 +45,31 @@ class TweetOut(BaseModel):
     like_count: int
     liked_by_user: bool
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class ProfileOut(BaseModel):
+    username: str
+    created_at: datetime
+    tweet_count: int
+    likes_received: int
+    followers: int
+
+class ProfileTimeline(BaseModel):
+    profile: ProfileOut
+    tweets: List[TweetOut]
+    # pass back as ?cursor= for the next page; null on the last page
+    next_cursor: Optional[str] = None
+
+class TweetBatchItem(BaseModel):
+    id: int
+    found: bool
+    tweet: Optional[TweetOut] = None
+
+class TweetStats(BaseModel):
+    tweet_id: int
+    impressions: int
+    unique_viewers: int
+
+class TrendingTag(BaseModel):
+    tag: str
+    score: float
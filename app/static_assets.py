@@ -0,0 +1,183 @@
+# app/static_assets.py
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import threading
+
+from fastapi import HTTPException, status
+from fastapi.responses import FileResponse
+from starlette.middleware.gzip import GZipMiddleware
+
+from app.utils.settings import settings
+
+try:  # optional: brotli variants are only built when the package is installed
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+# don't bother precompressing these: already compressed or too small to gain
+SKIP_COMPRESSION = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".woff", ".woff2", ".gz", ".br", ".zip"}
+MIN_COMPRESS_SIZE = 256
+
+# fingerprinted URLs never change content, so they can be cached forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+# logical names (and index.html) must be revalidated to pick up new builds
+REVALIDATE = "no-cache"
+
+def parse_accept_encoding(header: str) -> set[str]:
+    """
+    Return the content codings a client accepts (q > 0).
+    """
+    accepted = set()
+    for part in header.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding and q > 0:
+            accepted.add(coding)
+    return accepted
+
+class StaticAssets:
+    """
+    Build step + server for the SPA's static files.
+
+    build() copies every file under `source_dir` to `build_dir` as
+    `name.<hash>.ext`, plus `.gz` (and `.br` when brotli is installed)
+    variants, rewrites references in index.html to the fingerprinted names
+    and writes manifest.json. Unchanged files are not recompressed, so
+    running it at image build time makes startup nearly free.
+    """
+
+    def __init__(self, source_dir: str, build_dir: str):
+        self.source_dir = source_dir
+        self.build_dir = build_dir
+        # {logical path: fingerprinted path}
+        self.manifest: dict[str, str] = {}
+        # {fingerprinted path: logical path}
+        self._by_fingerprint: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    # ─── build ───────────────────────────────────────────────────────────────
+    def _fingerprint(self, logical: str, data: bytes) -> str:
+        root, ext = os.path.splitext(logical)
+        return f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+    def _emit(self, logical: str, data: bytes) -> str:
+        name = self._fingerprint(logical, data)
+        target = os.path.join(self.build_dir, name)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # write to a temp name first so concurrent workers never serve partial files
+            variants = {"": data}
+            if os.path.splitext(logical)[1].lower() not in SKIP_COMPRESSION and len(data) >= MIN_COMPRESS_SIZE:
+                variants[".gz"] = gzip.compress(data, compresslevel=9, mtime=0)
+                if brotli is not None:
+                    variants[".br"] = brotli.compress(data, quality=11)
+            for suffix, payload in variants.items():
+                tmp = f"{target}{suffix}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp, target + suffix)
+        return name
+
+    def build(self) -> dict[str, str]:
+        """
+        Fingerprint and precompress every asset; returns the manifest.
+        """
+        manifest = {}
+        sources = {}
+        for dirpath, _, filenames in os.walk(self.source_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                logical = os.path.relpath(path, self.source_dir).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    sources[logical] = f.read()
+
+        # html last, so it can point at the other assets' fingerprinted names
+        for logical in sorted(sources, key=lambda p: p.endswith(".html")):
+            data = sources[logical]
+            if logical.endswith(".html"):
+                text = data.decode("utf-8")
+                for src, dst in manifest.items():
+                    text = text.replace(f"/static/{src}", f"/static/{dst}")
+                data = text.encode("utf-8")
+            manifest[logical] = self._emit(logical, data)
+
+        os.makedirs(self.build_dir, exist_ok=True)
+        with open(os.path.join(self.build_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        self._load(manifest)
+        logging.info(f"Static assets built: {len(manifest)} files (brotli={'on' if brotli else 'off'})")
+        return manifest
+
+    def _load(self, manifest: dict[str, str]) -> None:
+        self.manifest = manifest
+        self._by_fingerprint = {v: k for k, v in manifest.items()}
+
+    def ensure_built(self) -> None:
+        if not self.manifest:
+            with self._lock:
+                if not self.manifest:
+                    self.build()
+
+    # ─── serve ───────────────────────────────────────────────────────────────
+    def response(self, path: str, accept_encoding: str = "") -> FileResponse:
+        """
+        FileResponse for a logical or fingerprinted asset path, picking the
+        best precompressed variant the client accepts.
+        """
+        self.ensure_built()
+        if path in self._by_fingerprint:
+            logical, name, cache_control = self._by_fingerprint[path], path, IMMUTABLE
+        elif path in self.manifest:
+            logical, name, cache_control = path, self.manifest[path], REVALIDATE
+        else:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+        file_path = os.path.join(self.build_dir, name)
+        headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        accepted = parse_accept_encoding(accept_encoding)
+        for coding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if coding in accepted and os.path.exists(file_path + suffix):
+                file_path += suffix
+                headers["Content-Encoding"] = coding
+                break
+        media_type = mimetypes.guess_type(logical)[0] or "application/octet-stream"
+        return FileResponse(file_path, media_type=media_type, headers=headers)
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that leaves some paths alone: precompressed static assets
+    and streaming endpoints (which compress themselves, if at all).
+    """
+
+    def __init__(self, app, exclude_paths: tuple[str, ...] = (),
+                 exclude_prefixes: tuple[str, ...] = (), **kwargs):
+        super().__init__(app, **kwargs)
+        # paths matched exactly, and path prefixes (e.g. "/static/")
+        self.exclude_paths = frozenset(exclude_paths)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            path = scope["path"]
+            if path in self.exclude_paths or path.startswith(self.exclude_prefixes):
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
+
+# singleton used by server.py
+assets = StaticAssets(settings.static_dir, settings.static_build_dir)
+
+if __name__ == "__main__":
+    # build-time step: python -m app.static_assets
+    logging.basicConfig(level=logging.INFO)
+    print(json.dumps(assets.build(), indent=2))
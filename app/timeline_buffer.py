@@ -0,0 +1,205 @@
+# app/timeline_buffer.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+
+from app import cache
+from app.schemas import TweetOut
+from app.utils.settings import settings
+
+# pub/sub channel carrying timeline changes between workers
+CHANNEL = "timeline:events"
+
+class _Entry:
+    """
+    One rendered tweet: its id plus the exact JSON bytes the API returns.
+    """
+    __slots__ = ("id", "payload")
+
+    def __init__(self, id: int, payload: bytes):
+        self.id = id
+        self.payload = payload
+
+def render(tweet: dict) -> bytes:
+    """
+    Serialize a tweet dict exactly as the TweetOut response model would.
+    """
+    return TweetOut(**tweet).model_dump_json().encode("utf-8")
+
+class TimelineBuffer:
+    """
+    Per-worker ring buffer of the newest `capacity` tweets, newest first,
+    kept as pre-serialized JSON so the head of the global timeline is served
+    without touching the database or the cache.
+
+    The buffer is primed from the database on first use, then updated by
+    create_tweet in this worker and by events published from other workers.
+    Anything it can't apply incrementally just marks it for re-priming.
+    """
+
+    def __init__(self, capacity: int = 200):
+        self.capacity = capacity
+        self._entries: deque[_Entry] = deque(maxlen=capacity)
+        self._ids: set[int] = set()
+        # primed from the DB and not invalidated since
+        self.ready = False
+        # True while the buffer holds every tweet there is (table smaller
+        # than capacity), so any page inside it is complete
+        self.complete = False
+        # sync endpoints run in the threadpool, the listener on the loop
+        self._lock = threading.Lock()
+        # lets the listener skip events this worker published itself
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._task = None
+
+    # ─── reads ───────────────────────────────────────────────────────────────
+    def page(self, skip: int, limit: int) -> tuple[list[int], bytes] | None:
+        """
+        (ids, JSON array) for tweets [skip, skip + limit) if the buffer can
+        answer it, else None (caller falls through to the normal path).
+        """
+        with self._lock:
+            if not self.ready:
+                return None
+            if skip + limit > len(self._entries) and not self.complete:
+                return None
+            entries = list(self._entries)[skip:skip + limit]
+        return [e.id for e in entries], b"[" + b",".join(e.payload for e in entries) + b"]"
+
+    def snapshot(self) -> list[tuple[int, bytes]]:
+        """
+        (id, rendered JSON) for every buffered tweet, newest first.
+        """
+        with self._lock:
+            return [(e.id, e.payload) for e in self._entries]
+
+    # ─── writes ──────────────────────────────────────────────────────────────
+    def prime(self, tweets: list[dict]) -> None:
+        """
+        Load the newest tweets (newest first) from the database. Entries
+        pushed meanwhile that are newer than the snapshot are kept.
+        """
+        self.prime_rendered([(t["id"], render(t)) for t in tweets[:self.capacity]])
+
+    def prime_rendered(self, rendered: list[tuple[int, bytes]]) -> None:
+        """
+        Same as prime, from already rendered (id, JSON) pairs, e.g. the
+        shared head another worker published.
+        """
+        entries = [_Entry(id, payload) for id, payload in rendered[:self.capacity]]
+        with self._lock:
+            newest = entries[0].id if entries else 0
+            fresh = [e for e in self._entries if e.id > newest]
+            self._entries = deque(fresh + entries, maxlen=self.capacity)
+            self._ids = {e.id for e in self._entries}
+            self.complete = len(rendered) < self.capacity and len(self._entries) < self.capacity
+            self.ready = True
+
+    def push(self, id: int, payload: bytes) -> None:
+        """
+        Add a newly created tweet at the head.
+        """
+        with self._lock:
+            if id in self._ids:
+                return
+            if self._entries and id < self._entries[0].id:
+                # arrived out of order; let the next read re-prime
+                self.ready = False
+                return
+            if len(self._entries) == self.capacity:
+                self._ids.discard(self._entries[-1].id)
+                self.complete = False
+            self._entries.appendleft(_Entry(id, payload))
+            self._ids.add(id)
+
+    def invalidate(self, id: int | None = None) -> None:
+        """
+        Mark the buffer for re-priming. With `id` (an edited or deleted
+        tweet) that entry is dropped right away, so the re-prime can't carry
+        it over as one pushed after the snapshot.
+        """
+        with self._lock:
+            if id in self._ids:
+                self._entries = deque((e for e in self._entries if e.id != id),
+                                      maxlen=self.capacity)
+                self._ids.discard(id)
+            self.ready = False
+
+    def add(self, tweet: dict) -> str:
+        """
+        Push a tweet created in this worker; returns the event to publish
+        so other workers can do the same.
+        """
+        payload = render(tweet)
+        self.push(tweet["id"], payload)
+        return json.dumps({"op": "new", "id": tweet["id"], "origin": self.origin,
+                           "payload": payload.decode("utf-8")})
+
+    # ─── cross-worker events ─────────────────────────────────────────────────
+    async def publish(self, event: str) -> None:
+        backend = cache.backend
+        if backend is None or not backend.shared:
+            return
+        try:
+            # the shared head no longer matches; the next worker to prime
+            # from the database publishes a fresh one
+            await cache.invalidate_timeline_head()
+            await backend.publish(CHANNEL, event)
+        except Exception:
+            logging.exception("Failed to publish timeline event")
+
+    async def publish_invalidate(self, id: int | None = None) -> None:
+        """
+        Tell every worker (this one included) to re-prime, e.g. after tweet
+        `id` was edited or deleted.
+        """
+        self.invalidate(id)
+        await self.publish(json.dumps({"op": "invalidate", "id": id, "origin": self.origin}))
+
+    def apply(self, message: str) -> None:
+        event = json.loads(message)
+        if event.get("origin") == self.origin:
+            return
+        if event.get("op") == "new":
+            self.push(event["id"], event["payload"].encode("utf-8"))
+        else:
+            self.invalidate(event.get("id"))
+
+    async def _listen(self) -> None:
+        backend = cache.backend
+        while self._task is not None:
+            try:
+                async for _, message in backend.subscribe(CHANNEL):
+                    self.apply(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # we may have missed events while disconnected
+                logging.exception("Timeline event listener failed; re-subscribing")
+                self.invalidate()
+                await asyncio.sleep(1)
+
+    def start(self) -> None:
+        """
+        Start listening for other workers' events (only with a shared cache).
+        """
+        backend = cache.backend
+        if self._task is None and backend is not None and backend.shared:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+# per-worker singleton used by the tweets router
+timeline_buffer = TimelineBuffer(capacity=settings.timeline_buffer_size)
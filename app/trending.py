@@ -0,0 +1,203 @@
+# app/trending.py
+
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+from app import cache
+
+# "#tag" not glued to a preceding word char; tags are case-insensitive
+HASHTAG_RE = re.compile(r"(?<!\w)#(\w{1,64})")
+
+# rolling windows served by the trending endpoint, in seconds
+WINDOWS = {"1h": 3600, "24h": 86400}
+
+def _shared():
+    """
+    The cache backend if it is shared between workers (Redis), else None.
+    """
+    backend = cache.backend
+    return backend if backend is not None and backend.shared else None
+
+def extract_hashtags(content: str) -> set[str]:
+    """
+    Return the distinct, lower-cased hashtags in a tweet body.
+    """
+    return {tag.lower() for tag in HASHTAG_RE.findall(content or "")}
+
+class SpaceSaving:
+    """
+    Space-saving top-K sketch: tracks at most `capacity` keys. When full, a new
+    key replaces the current minimum and inherits its count, so heavy hitters
+    are never lost and memory per bucket stays bounded.
+
+    The minimum comes from a heap of (count, key) entries with lazy deletion:
+    an entry is stale once its key's count has moved on, and is skipped when
+    it surfaces. That keeps eviction O(log capacity); the heap is rebuilt
+    whenever stale entries outnumber live ones.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def add(self, key: str, n: float = 1) -> None:
+        if key in self.counts or len(self.counts) < self.capacity:
+            count = self.counts[key] = self.counts.get(key, 0) + n
+        else:
+            while True:
+                floor, victim = heapq.heappop(self._heap)
+                if self.counts.get(victim) == floor:
+                    break
+            del self.counts[victim]
+            count = self.counts[key] = floor + n
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 2 * self.capacity:
+            self._heap = [(c, k) for k, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+class TrendingTracker:
+    """
+    Counts hashtags into fixed-size time buckets in memory, pushes the
+    per-bucket deltas to Redis sorted sets so every worker sees the
+    cluster-wide totals, and serves a decayed top-K per window from a
+    periodically refreshed snapshot.
+    """
+
+    def __init__(self, bucket_seconds: int = 300, capacity: int = 1000,
+                 refresh_seconds: int = 10, top_k: int = 50):
+        # width of one counting bucket
+        self.bucket_seconds = bucket_seconds
+        # max distinct tags tracked per bucket (space-saving sketch)
+        self.capacity = capacity
+        # how long a computed ranking is served before being rebuilt
+        self.refresh_seconds = refresh_seconds
+        # how many tags are kept in each ranking snapshot
+        self.top_k = top_k
+        # local buckets: {bucket_start: SpaceSaving}
+        self._buckets: dict[int, SpaceSaving] = {}
+        # deltas not yet pushed to Redis: {bucket_start: {tag: count}}
+        self._pending: dict[int, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # ranking snapshots: {window: (computed_at, [(tag, score), ...])}
+        self._snapshots: dict[str, tuple[float, list[tuple[str, float]]]] = {}
+        # record() and the rankings run on the event loop (record() via the
+        # outbox relay); the lock keeps the buckets safe if a thread joins in
+        self._lock = threading.Lock()
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts // self.bucket_seconds) * self.bucket_seconds
+
+    def _weight(self, bucket: int, now: float, window: int) -> float:
+        """
+        Exponential decay: a bucket loses half its weight every quarter window.
+        """
+        age = max(0.0, now - (bucket + self.bucket_seconds))
+        return 0.5 ** (age / (window / 4))
+
+    def record(self, content: str, ts: float | None = None) -> None:
+        """
+        Count the hashtags of a newly created tweet.
+        Called by the outbox relay once the tweet.created event is applied.
+        """
+        tags = extract_hashtags(content)
+        if not tags:
+            return
+        bucket = self._bucket(ts if ts is not None else time.time())
+        with self._lock:
+            sketch = self._buckets.get(bucket)
+            if sketch is None:
+                sketch = self._buckets[bucket] = SpaceSaving(self.capacity)
+            for tag in tags:
+                sketch.add(tag)
+                # only queue deltas when there is a shared store to push them to
+                if _shared() is not None:
+                    self._pending[bucket][tag] += 1
+            self._evict(time.time())
+
+    def _evict(self, now: float) -> None:
+        # drop buckets that have aged out of the longest window
+        horizon = now - max(WINDOWS.values()) - self.bucket_seconds
+        for bucket in [b for b in self._buckets if b < horizon]:
+            del self._buckets[bucket]
+
+    def _local_top(self, window: int, now: float) -> list[tuple[str, float]]:
+        totals: dict[str, float] = defaultdict(float)
+        with self._lock:
+            for bucket, sketch in self._buckets.items():
+                if bucket + self.bucket_seconds <= now - window:
+                    continue
+                w = self._weight(bucket, now, window)
+                for tag, n in sketch.counts.items():
+                    totals[tag] += n * w
+        return heapq.nlargest(self.top_k, totals.items(), key=lambda kv: kv[1])
+
+    async def flush(self) -> None:
+        """
+        Push pending bucket deltas to Redis in one pipeline.
+        No-op when the cache backend isn't shared across workers.
+        """
+        store = _shared()
+        if store is None:
+            return
+        with self._lock:
+            if not self._pending:
+                return
+            batch = {b: dict(tags) for b, tags in self._pending.items()}
+            self._pending.clear()
+        ttl = max(WINDOWS.values()) + self.bucket_seconds
+        try:
+            async with store.pipeline(transaction=False) as pipe:
+                for bucket, tags in batch.items():
+                    key = f"hashtags:{bucket}"
+                    for tag, n in tags.items():
+                        pipe.zincrby(key, n, tag)
+                    pipe.expire(key, ttl)
+                await pipe.execute()
+        except Exception:
+            logging.exception("Failed to push hashtag counts to Redis")
+
+    async def _redis_top(self, store, name: str, window: int, now: float) -> list[tuple[str, float]]:
+        first = self._bucket(now - window)
+        weights = {
+            f"hashtags:{b}": self._weight(b, now, window)
+            for b in range(first, self._bucket(now) + 1, self.bucket_seconds)
+        }
+        dest = f"trending:{name}"
+        await store.zunionstore(dest, weights, aggregate="SUM")
+        await store.expire(dest, self.refresh_seconds * 2)
+        rows = await store.zrevrange(dest, 0, self.top_k - 1, withscores=True)
+        return [(tag, float(score)) for tag, score in rows]
+
+    async def top(self, window: str = "1h", limit: int = 10) -> list[dict]:
+        """
+        Return the `limit` highest-scoring hashtags for a window.
+        Rankings are rebuilt at most every `refresh_seconds`, so a request
+        normally just slices a cached list.
+        """
+        now = time.time()
+        snap = self._snapshots.get(window)
+        if snap is None or now - snap[0] >= self.refresh_seconds:
+            ranking = None
+            store = _shared()
+            if store is not None:
+                await self.flush()
+                try:
+                    ranking = await self._redis_top(store, window, WINDOWS[window], now)
+                except Exception:
+                    logging.exception("Falling back to local hashtag counts")
+            if ranking is None:
+                ranking = self._local_top(WINDOWS[window], now)
+            snap = (now, ranking)
+            self._snapshots[window] = snap
+        return [
+            {"tag": tag, "score": round(score, 3)}
+            for tag, score in snap[1][:limit]
+            if score > 0
+        ]
+
+# per-worker singleton, fed by the outbox relay
+trending = TrendingTracker()
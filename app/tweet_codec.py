@@ -0,0 +1,101 @@
+# app/tweet_codec.py
+
+import struct
+from datetime import datetime, timedelta, timezone
+
+# First byte of every blob: what it holds and in which layout. Readers treat
+# an unknown tag as a cache miss, so a newer layout can be rolled out while
+# older workers are still running.
+TWEET_V1 = 0x01
+PAGE_V1 = 0x11
+
+# tag, id, user_id, created_at (µs since epoch, UTC), len(content);
+# followed by content and then username, both UTF-8
+_TWEET_V1 = struct.Struct("<BqqqI")
+# tag, number of entries; followed by (id, len(payload), payload) per entry
+_PAGE_V1 = struct.Struct("<BI")
+_PAGE_ENTRY = struct.Struct("<qI")
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _aware(dt: datetime) -> datetime:
+    # naive values are UTC (that's how SQLite hands them back)
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+def _to_micros(dt: datetime) -> int:
+    return (_aware(dt) - _EPOCH) // timedelta(microseconds=1)
+
+def _from_micros(us: int) -> datetime:
+    # aware UTC, as timezone=True columns return it on Postgres
+    return _EPOCH + timedelta(microseconds=us)
+
+# ─── single tweets ───────────────────────────────────────────────────────────
+def encode_tweet(tweet) -> bytes:
+    """
+    Pack a tweet (ORM object or row; `username` is optional) into a blob.
+    """
+    content = tweet.content.encode("utf-8")
+    username = (getattr(tweet, "username", None) or "").encode("utf-8")
+    header = _TWEET_V1.pack(
+        TWEET_V1, tweet.id, tweet.user_id or 0, _to_micros(tweet.created_at), len(content)
+    )
+    return header + content + username
+
+def decode_tweet(blob: bytes) -> dict | None:
+    """
+    Unpack a tweet blob; None if it is empty or in a layout we don't know.
+    """
+    if not blob or blob[0] != TWEET_V1:
+        return None
+    _, id, user_id, created_us, length = _TWEET_V1.unpack_from(blob)
+    start = _TWEET_V1.size
+    username = bytes(blob[start + length:]).decode("utf-8")
+    return {
+        "id": id,
+        "content": bytes(blob[start:start + length]).decode("utf-8"),
+        "created_at": _from_micros(created_us),
+        "user_id": user_id or None,
+        "username": username or None,
+    }
+
+def from_hash(data: dict) -> dict | None:
+    """
+    Read the legacy layout: a hash of stringified fields, no username.
+    """
+    if not data:
+        return None
+    return {
+        "id": int(data["id"]),
+        "content": data["content"],
+        "created_at": _aware(datetime.fromisoformat(data["created_at"])),
+        "user_id": int(data["user_id"]) if data.get("user_id") not in (None, "", "None") else None,
+        "username": None,
+    }
+
+# ─── pre-rendered timeline pages ─────────────────────────────────────────────
+def encode_page(entries: list[tuple[int, bytes]]) -> bytes:
+    """
+    Pack (tweet id, rendered JSON) pairs, newest first, into one blob.
+    """
+    parts = [_PAGE_V1.pack(PAGE_V1, len(entries))]
+    for id, payload in entries:
+        parts.append(_PAGE_ENTRY.pack(id, len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+def decode_page(blob: bytes) -> list[tuple[int, bytes]] | None:
+    """
+    Unpack a page blob; None if it is empty or in a layout we don't know.
+    """
+    if not blob or blob[0] != PAGE_V1:
+        return None
+    view = memoryview(blob)
+    _, count = _PAGE_V1.unpack_from(view)
+    offset = _PAGE_V1.size
+    entries = []
+    for _ in range(count):
+        id, length = _PAGE_ENTRY.unpack_from(view, offset)
+        offset += _PAGE_ENTRY.size
+        entries.append((id, bytes(view[offset:offset + length])))
+        offset += length
+    return entries
@@ -11,13 +11,83 @@ class Settings:
     # Core URLs and keys (now guaranteed loaded into os.environ if present)
     database_url: str = os.getenv("DATABASE_URL", "")
     redis_url: str = os.getenv("REDIS_URL", "")
+    # "redis" or "memory" (embedded, per-process); defaults to redis if configured
+    cache_backend: str = os.getenv("CACHE_BACKEND", "redis" if redis_url else "memory")
+    # Comma-separated read replica URLs; empty = every query hits the primary
+    database_replica_urls: list[str] = [
+        u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()
+    ]
+    # Seconds a client's reads stay on the primary after it wrote something
+    # (tracked in Redis across workers; per worker with the embedded cache)
+    replica_sticky_seconds: float = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    # Seconds a failing replica is skipped before it's tried again
+    replica_retry_seconds: float = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
 
     secret_key: str = os.getenv("SECRET_KEY", "")
     algorithm: str = os.getenv("ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+    # Monthly RANGE partitioning of tweets (Postgres only; ignored elsewhere).
+    # Applies when the tables are first created; see app/partitions.py to migrate
+    tweets_partitioned: bool = os.getenv("TWEETS_PARTITIONED", "false").lower() == "true"
+    # Archive tweets older than this many days (0 = never archive)
+    tweet_retention_days: int = int(os.getenv("TWEET_RETENTION_DAYS", "0"))
+    # Where cold tweets go: "table" (tweets_archive) or "ndjson" (gzip segments)
+    tweet_archive_mode: str = os.getenv("TWEET_ARCHIVE_MODE", "table")
+    tweet_archive_dir: str = os.getenv("TWEET_ARCHIVE_DIR", "archive")
+
+    # SPA assets: sources and the fingerprinted/precompressed build output
+    static_dir: str = os.getenv("STATIC_DIR", "static")
+    static_build_dir: str = os.getenv("STATIC_BUILD_DIR", "static_build")
+
+    # Query instrumentation: warn above this many queries per request, and
+    # when one statement repeats this often within a request (likely N+1)
+    query_budget: int = int(os.getenv("QUERY_BUDGET", "50"))
+    n_plus_one_threshold: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+    # Requests with "X-Profile: <PROFILE_TOKEN>" are sampled (disabled if empty)
+    profile_token: str = os.getenv("PROFILE_TOKEN", "")
+    profile_dir: str = os.getenv("PROFILE_DIR", "profiles")
+    # Required as "X-Export-Token" by /api/export (exports disabled if empty)
+    export_token: str = os.getenv("EXPORT_TOKEN", "")
+    # Rotating log file next to stdout logging (empty = no file logging)
+    log_file: str = os.getenv("LOG_FILE", "app.log")
+
+    # Outbox relay: events per batch, idle poll interval, retries before giving up
+    outbox_batch_size: int = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    outbox_poll_seconds: float = float(os.getenv("OUTBOX_POLL_SECONDS", "1.0"))
+    outbox_max_attempts: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+    # events that gave up are kept this long for inspection, then purged
+    outbox_dead_letter_days: float = float(os.getenv("OUTBOX_DEAD_LETTER_DAYS", "7"))
+
     # Cache config
     tweet_cache_ttl_seconds: int = int(os.getenv("TWEET_CACHE_TTL_SECONDS", "3600"))
+    # Newest tweets indexed in the tweets:recent sorted set
+    recent_tweets_cache_size: int = int(os.getenv("RECENT_TWEETS_CACHE_SIZE", "1000"))
+    # "binary" (compact, versioned) or "hash" (legacy); readers accept both
+    tweet_cache_format: str = os.getenv("TWEET_CACHE_FORMAT", "binary")
+    # Newest tweets kept rendered in each worker's memory (>= max page size)
+    timeline_buffer_size: int = int(os.getenv("TIMELINE_BUFFER_SIZE", "200"))
+    # Lifetime of the shared pre-rendered head workers prime from (Redis only)
+    timeline_head_ttl_seconds: int = int(os.getenv("TIMELINE_HEAD_TTL_SECONDS", "30"))
+
+    # Impressions: seconds between batched writes, and how long a tweet's
+    # unique-viewer sketch survives without new views
+    impression_flush_seconds: float = float(os.getenv("IMPRESSION_FLUSH_SECONDS", "2.0"))
+    impression_ttl_days: int = int(os.getenv("IMPRESSION_TTL_DAYS", "30"))
+
+    # Background jobs: leader lease (Redis), how long shutdown waits for
+    # running jobs, and intervals of the periodic jobs in app/jobs.py
+    scheduler_lease_seconds: float = float(os.getenv("SCHEDULER_LEASE_SECONDS", "15"))
+    scheduler_drain_seconds: float = float(os.getenv("SCHEDULER_DRAIN_SECONDS", "30"))
+    trending_flush_seconds: float = float(os.getenv("TRENDING_FLUSH_SECONDS", "5"))
+    cache_warm_seconds: float = float(os.getenv("CACHE_WARM_SECONDS", "300"))
+    counter_reconcile_seconds: float = float(os.getenv("COUNTER_RECONCILE_SECONDS", "3600"))
+
+    # Rate limiting ("local" = in-process buckets synced to Redis in batches,
+    # "redis" = exact Lua check per request)
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    rate_limit_mode: str = os.getenv("RATE_LIMIT_MODE", "local")
+    rate_limit_sync_seconds: float = float(os.getenv("RATE_LIMIT_SYNC_SECONDS", "1.0"))
 
     @property
     def access_token_expire_delta(self) -> timedelta:
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import random
+import string
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app import cache, tweet_codec
+from app.timeline_buffer import render
+from app.utils.settings import settings
+
+parser = argparse.ArgumentParser(
+    description="Compare the legacy hash layout of cached tweets with the compact encoding."
+)
+parser.add_argument("-n", "--tweets", type=int, default=5000, help="tweets to cache per layout")
+parser.add_argument("--batch", type=int, default=100, help="ids per multi-get")
+args = parser.parse_args()
+
+def fake_tweets(n: int, first_id: int) -> list:
+    start = datetime(2025, 1, 1)
+    return [
+        SimpleNamespace(
+            id=first_id + i,
+            user_id=random.randint(1, 10_000),
+            username="user" + str(random.randint(1, 10_000)),
+            content=" ".join(
+                "".join(random.choices(string.ascii_lowercase, k=random.randint(2, 9)))
+                for _ in range(random.randint(3, 25))
+            ),
+            created_at=start + timedelta(seconds=i, microseconds=random.randint(0, 999_999)),
+        )
+        for i in range(n)
+    ]
+
+def per_op(seconds: float, ops: int) -> str:
+    return f"{seconds / ops * 1e6:8.1f} µs"
+
+async def memory_usage(keys: list[str]) -> float | None:
+    # Redis only: MEMORY USAGE includes key, value and per-entry overhead
+    client = cache.redis_client
+    if client is None:
+        return None
+    sample = keys[:200]
+    try:
+        sizes = [await client.memory_usage(k) for k in sample]
+    except Exception:
+        # MEMORY USAGE not supported (e.g. some managed/emulated servers)
+        return None
+    return sum(s or 0 for s in sizes) / len(sample)
+
+async def read_hashes(ids: list[int]) -> list:
+    async with cache.backend.pipeline(transaction=False) as pipe:
+        for i in ids:
+            pipe.hgetall(f"tweet:{i}")
+        rows = await pipe.execute()
+    return [tweet_codec.from_hash(r) for r in rows]
+
+async def read_blobs(ids: list[int]) -> list:
+    blobs = await cache.backend.mget_bytes(*(f"tweet:{i}:bin" for i in ids))
+    return [tweet_codec.decode_tweet(b) for b in blobs]
+
+async def timed_reads(read, ids: list[int]) -> float:
+    t0 = time.perf_counter()
+    for i in range(0, len(ids), args.batch):
+        await read(ids[i:i + args.batch])
+    return time.perf_counter() - t0
+
+async def main():
+    await cache.init_cache()
+    print(f"backend: {settings.cache_backend}, {args.tweets} tweets per layout, batches of {args.batch}")
+    hashed, packed = fake_tweets(args.tweets, 10_000_000), fake_tweets(args.tweets, 20_000_000)
+    try:
+        for fmt, tweets in (("hash", hashed), ("binary", packed)):
+            settings.tweet_cache_format = fmt
+            for t in tweets:
+                await cache.set_tweet_cache(t)
+
+        # ─── size ────────────────────────────────────────────────────────────
+        raw_hash = sum(
+            len(f) + len(v)
+            for t in hashed
+            for f, v in (("id", str(t.id)), ("content", t.content),
+                         ("created_at", t.created_at.isoformat()), ("user_id", str(t.user_id)))
+        ) / len(hashed)
+        raw_blob = sum(len(tweet_codec.encode_tweet(t)) for t in packed) / len(packed)
+        print(f"payload bytes/tweet    hash {raw_hash:7.1f}   binary {raw_blob:7.1f} (incl. username)")
+        hash_mem = await memory_usage([f"tweet:{t.id}" for t in hashed])
+        blob_mem = await memory_usage([f"tweet:{t.id}:bin" for t in packed])
+        if hash_mem is not None:
+            print(f"redis MEMORY USAGE     hash {hash_mem:7.1f}   binary {blob_mem:7.1f}")
+
+        # ─── latency ─────────────────────────────────────────────────────────
+        hash_ids, blob_ids = [t.id for t in hashed], [t.id for t in packed]
+        hash_s = await timed_reads(read_hashes, hash_ids)
+        blob_s = await timed_reads(read_blobs, blob_ids)
+        print(f"read+decode per tweet  hash {per_op(hash_s, len(hash_ids))}   binary {per_op(blob_s, len(blob_ids))}")
+
+        # ─── timeline page ───────────────────────────────────────────────────
+        page = [
+            {"id": t.id, "content": t.content, "created_at": t.created_at,
+             "username": t.username, "like_count": 0, "liked_by_user": False}
+            for t in packed[:settings.timeline_buffer_size]
+        ]
+        rounds = 50
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            [(t["id"], render(t)) for t in page]
+        render_s = time.perf_counter() - t0
+        blob = tweet_codec.encode_page([(t["id"], render(t)) for t in page])
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            tweet_codec.decode_page(blob)
+        decode_s = time.perf_counter() - t0
+        print(f"timeline head ({len(page)} tweets, {len(blob)} bytes): "
+              f"render {per_op(render_s, rounds)}   decode page {per_op(decode_s, rounds)}")
+    finally:
+        for t in hashed + packed:
+            await cache.invalidate_tweet_cache(t.id)
+        await cache.close_cache()
+
+asyncio.run(main())
@@ -0,0 +1,27 @@
+import argparse
+import sys
+
+from app.database import ReadSessionLocal
+from app.export import EXPORTERS, gzip_stream, iter_ndjson
+
+parser = argparse.ArgumentParser(description="Stream a table to NDJSON with constant memory.")
+parser.add_argument("table", choices=sorted(EXPORTERS))
+parser.add_argument("-o", "--output", help="output file (default: stdout)")
+parser.add_argument("--since-id", type=int, default=0, help="resume after this id")
+parser.add_argument("--gzip", action="store_true", help="gzip the output on the fly")
+args = parser.parse_args()
+
+db = ReadSessionLocal()
+try:
+    chunks = iter_ndjson(db, args.table, args.since_id)
+    if args.gzip:
+        chunks = gzip_stream(chunks)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+finally:
+    db.close()
@@ -2,17 +2,23 @@
 
 import logging
 from logging.handlers import RotatingFileHandler
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+import os
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.gzip import GZipMiddleware
 
 from sqlalchemy import text
 from app.database import engine, Base
-from app.routers import accounts, tweets
+from app.routers import accounts, tweets, export
 from app.cache import init_cache, close_cache
-from app.like_batcher import like_batcher
+from app.timeline_buffer import timeline_buffer
+from app.outbox import outbox_relay
+from app.jobs import register_jobs
+from app.scheduler import scheduler
+from app.partitions import ensure_tweet_partitions
+from app.static_assets import SelectiveGZipMiddleware, assets
+from app.query_stats import profiling_requested, query_stats_middleware
+from app.utils.settings import settings
 from app.logging_config import setup_logging
 
 # Configure JSON logging
@@ -25,8 +31,17 @@ app = FastAPI(
     redoc_url=None,
 )
 
+# Periodic background jobs (started with the app, see on_startup)
+register_jobs(scheduler)
+
 # Middleware
-app.add_middleware(GZipMiddleware, minimum_size=1000)
+# static assets are served precompressed and exports stream, so skip those
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=1000,
+    exclude_paths=("/",),
+    exclude_prefixes=("/static/", "/api/export/"),
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -48,31 +63,52 @@ async def on_startup():
 
     # Now create any missing tables: tweets, accounts, and likes
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so add indexes defined since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
     logging.info("DB tables ready (with likes table rebuilt)")
 
-    # …your cache + batcher startup here…
+    # fingerprint + precompress the SPA (cheap if done at image build time)
+    assets.build()
+
+    # monthly tweet partitions (no-op unless TWEETS_PARTITIONED on Postgres)
+    ensure_tweet_partitions()
+
+    await init_cache()
+    logging.info(f"Cache ready ({settings.cache_backend} backend)")
+
+    # keep this worker's timeline buffer in step with the other workers
+    timeline_buffer.start()
+    # apply post-write side effects recorded in the outbox table
+    outbox_relay.start()
+    # periodic jobs: buffer flushes in every worker, the rest on the leader
+    scheduler.start()
 
 @app.on_event("shutdown")
 async def on_shutdown():
-    await app.state.like_batcher.flush()
-    logging.info("Like-batcher flushed")
+    # the relay feeds trending counts, so stop it before the final flushes
+    await outbox_relay.stop()
+    await scheduler.stop()
+    logging.info("Scheduler drained")
+    await timeline_buffer.stop()
     await close_cache()
     logging.info("Cache closed")
 
 # ─── file logging ─────────────────────────────────────────────────
-log_file = "app.log"
-file_handler = RotatingFileHandler(
-    filename=log_file,
-    maxBytes=5 * 1024 * 1024,  # 5 MB
-    backupCount=2,             # keep up to 2 old files
-)
-file_handler.setLevel(logging.INFO)
-file_formatter = logging.Formatter(
-    "%(asctime)s %(levelname)s %(name)s %(message)s"
-)
-file_handler.setFormatter(file_formatter)
-# attach to root logger
-logging.getLogger().addHandler(file_handler)
+if settings.log_file:
+    file_handler = RotatingFileHandler(
+        filename=settings.log_file,
+        maxBytes=5 * 1024 * 1024,  # 5 MB
+        backupCount=2,             # keep up to 2 old files
+    )
+    file_handler.setLevel(logging.INFO)
+    file_formatter = logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s %(message)s"
+    )
+    file_handler.setFormatter(file_formatter)
+    # attach to root logger
+    logging.getLogger().addHandler(file_handler)
 
 # ─── Request logging middleware ──────────────────────────────────────────────
 @app.middleware("http")
@@ -83,6 +119,9 @@ async def log_requests(request, call_next):
     logger.info(f"Responded {response.status_code} to {request.method} {request.url.path}")
     return response
 
+# ─── Query counting / Server-Timing / on-demand profiling ───────────────────
+app.middleware("http")(query_stats_middleware)
+
 # ─── Logs endpoint ───────────────────────────────────────────────────────────
 @app.get("/logs", response_class=PlainTextResponse, summary="Fetch the application log")
 def get_logs():
@@ -95,12 +134,34 @@ def get_logs():
     except FileNotFoundError:
         return "Log file not found.\n"
 
-# Serve frontend
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# ─── Profile dumps (same token as the X-Profile request header) ─────────────
+@app.get("/debug/profiles/{name}", response_class=PlainTextResponse, include_in_schema=False)
+def get_profile(name: str, request: Request):
+    """
+    Returns a folded-stack profile captured by an X-Profile request.
+    """
+    path = os.path.join(settings.profile_dir, os.path.basename(name))
+    if not profiling_requested(request) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return FileResponse(path, media_type="text/plain")
+
+@app.get("/debug/scheduler", include_in_schema=False)
+def get_scheduler_metrics(request: Request):
+    """
+    Leadership and per-job runtime metrics of this worker's scheduler.
+    """
+    if not profiling_requested(request):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return scheduler.metrics()
+
+# Serve frontend (precompressed, fingerprinted assets)
+@app.get("/static/{path:path}", include_in_schema=False)
+async def serve_static(path: str, request: Request):
+    return assets.response(path, request.headers.get("accept-encoding", ""))
 
 @app.get("/", include_in_schema=False)
-async def serve_spa():
-    return FileResponse("static/index.html")
+async def serve_spa(request: Request):
+    return assets.response("index.html", request.headers.get("accept-encoding", ""))
 
 # Health check
 @app.get("/health", tags=["health"])
@@ -110,3 +171,4 @@ def health():
 # Mount API routers
 app.include_router(accounts.router, prefix="/api/accounts", tags=["accounts"])
 app.include_router(tweets.router,  prefix="/api/tweets",   tags=["tweets"])
+app.include_router(export.router,  prefix="/api/export",   tags=["export"])
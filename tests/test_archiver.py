@@ -0,0 +1,57 @@
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import crud
+from app.archiver import TweetArchiver
+from app.models import Account, Like, Tweet, TweetArchive
+
+@pytest.fixture(autouse=True)
+def aged_tweets(db):
+    user = Account(username="old", email="old@test.com", hashed_password="pw")
+    db.add(user)
+    db.commit()
+    now = datetime.now(timezone.utc)
+    for i, age in enumerate([400, 200, 100, 40, 1]):
+        db.add(Tweet(content=f"cat {i}", user_id=user.id, created_at=now - timedelta(days=age)))
+    db.commit()
+    db.add(Like(tweet_id=1, user_id=user.id))
+    db.commit()
+
+def test_archive_to_table_and_search_on_demand(db):
+    moved = TweetArchiver(retention_days=90, batch_size=2).run_once()
+    assert moved == 3
+    assert db.query(Tweet).count() == 2
+    assert db.query(TweetArchive).count() == 3
+    assert db.query(Like).count() == 0
+
+    live = crud.search_tweets(db, "cat")
+    assert [t.content for t in live] == ["cat 4", "cat 3"]
+    everything = crud.search_tweets(db, "cat", include_archive=True)
+    assert [t.content for t in everything] == ["cat 4", "cat 3", "cat 2", "cat 1", "cat 0"]
+    # the archive is not queried once the live stages fill the limit
+    assert len(crud.search_tweets(db, "cat", limit=2, include_archive=True)) == 2
+
+def test_pass_stops_when_leadership_is_lost(db):
+    checks = []
+
+    def still_leader():
+        checks.append(1)
+        return len(checks) == 1
+
+    # one batch of two goes through, then the lease is gone
+    assert TweetArchiver(retention_days=90, batch_size=2).run_once(still_leader) == 2
+    assert db.query(Tweet).count() == 3
+    # the next leader picks up where it stopped
+    assert TweetArchiver(retention_days=90, batch_size=2).run_once() == 1
+
+def test_archive_to_ndjson_segments(db, tmp_path):
+    archiver = TweetArchiver(retention_days=150, mode="ndjson", directory=str(tmp_path / "segments"))
+    assert archiver.run_once() == 2
+    (segment,) = (tmp_path / "segments").iterdir()
+    assert segment.name == "tweets-1-2.ndjson.gz"
+    rows = [json.loads(l) for l in gzip.decompress(segment.read_bytes()).splitlines()]
+    assert [r["content"] for r in rows] == ["cat 0", "cat 1"]
+    assert db.query(Tweet).count() == 3
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import random
+
+import pytest
+
+from app.cache_backends import MemoryBackend, RedisBackend, SortedList
+
+def _backends():
+    yield pytest.param(MemoryBackend, id="memory")
+    url = os.getenv("TEST_REDIS_URL")
+    if url:
+        import redis.asyncio as aioredis
+
+        def make_redis():
+            return RedisBackend(aioredis.from_url(url, decode_responses=True))
+        yield pytest.param(make_redis, id="redis")
+
+@pytest.fixture(params=list(_backends()))
+def backend(request):
+    """
+    Every backend must pass the same conformance tests. Redis runs only when
+    TEST_REDIS_URL points at a disposable database (it is flushed).
+    Yields a factory: the backend is built inside the scenario's event loop.
+    """
+    async def make():
+        b = request.param()
+        if isinstance(b, RedisBackend):
+            await b.client.flushdb()
+        return b
+    return make
+
+def run(make, scenario):
+    # one loop per test: a Redis client's pooled connections stay bound to
+    # the loop that opened them
+    async def main():
+        b = await make()
+        try:
+            await scenario(b)
+        finally:
+            await b.close()
+    asyncio.run(main())
+
+def test_strings_and_ttl(backend):
+    async def scenario(backend):
+        assert await backend.get("k") is None
+        await backend.set("k", 1)
+        assert await backend.get("k") == "1"
+        assert await backend.ttl("k") == -1
+        await backend.set("t", "x", ex=100)
+        assert 0 < await backend.ttl("t") <= 100
+        assert await backend.delete("k", "t", "missing") == 2
+        assert await backend.ttl("k") == -2
+    run(backend, scenario)
+
+def test_expiry_is_enforced(backend):
+    async def scenario(backend):
+        await backend.hset("h", {"a": 1})
+        await backend.expire("h", 1)
+        assert await backend.exists("h") == 1
+        await asyncio.sleep(1.1)
+        assert await backend.exists("h") == 0
+        assert await backend.hgetall("h") == {}
+    run(backend, scenario)
+
+def test_hashes(backend):
+    async def scenario(backend):
+        assert await backend.hset("h", {"a": 1, "b": "two"}) == 2
+        assert await backend.hset("h", {"a": 3}) == 0
+        assert await backend.hgetall("h") == {"a": "3", "b": "two"}
+        assert await backend.hget("h", "b") == "two"
+        assert await backend.hget("h", "zz") is None
+    run(backend, scenario)
+
+def test_sorted_sets(backend):
+    async def scenario(backend):
+        assert await backend.zadd("z", {"a": 1, "b": 3, "c": 2}) == 3
+        assert await backend.zincrby("z", 5, "a") == 6.0
+        assert await backend.zrevrange("z", 0, -1) == ["a", "b", "c"]
+        assert await backend.zrevrange("z", 1, 1, withscores=True) == [("b", 3.0)]
+        assert await backend.zrevrange("z", 5, 10) == []
+        assert await backend.zscore("z", "c") == 2.0
+        assert await backend.zrem("z", "c", "nope") == 1
+        assert await backend.zcard("z") == 2
+
+        await backend.zadd("t", {"m1": 1, "m2": 2, "m3": 3, "m4": 4})
+        # keep the top two
+        assert await backend.zremrangebyrank("t", 0, -3) == 2
+        assert await backend.zrevrange("t", 0, -1) == ["m4", "m3"]
+        assert await backend.zremrangebyrank("t", 5, 10) == 0
+        assert await backend.zremrangebyrank("t", 0, -1) == 2
+        assert await backend.exists("t") == 0
+
+        await backend.zadd("y", {"b": 10, "d": 1})
+        assert await backend.zunionstore("u", {"z": 1, "y": 0.5}) == 3
+        assert await backend.zrevrange("u", 0, -1, withscores=True) == [("b", 8.0), ("a", 6.0), ("d", 0.5)]
+    run(backend, scenario)
+
+def test_pipeline(backend):
+    async def scenario(backend):
+        async with backend.pipeline(transaction=False) as pipe:
+            pipe.hset("p", {"x": 1})
+            pipe.zadd("pz", {"m": 1})
+            pipe.hgetall("p")
+            results = await pipe.execute()
+        assert results[-1] == {"x": "1"}
+        assert await backend.zcard("pz") == 1
+    run(backend, scenario)
+
+def test_pubsub(backend):
+    async def scenario(backend):
+        received = []
+
+        async def listen():
+            async for channel, message in backend.subscribe("events"):
+                received.append((channel, message))
+                if len(received) == 2:
+                    return
+
+        task = asyncio.create_task(listen())
+        await asyncio.sleep(0.1)  # let the subscription register
+        await backend.publish("events", "one")
+        await backend.publish("other", "ignored")
+        await backend.publish("events", "two")
+        await asyncio.wait_for(task, 2)
+        assert received == [("events", "one"), ("events", "two")]
+    run(backend, scenario)
+
+def test_sorted_list_matches_sorted():
+    rng = random.Random(7)
+    sl, ref = SortedList(load=4), []
+    for _ in range(500):
+        v = rng.randint(0, 100)
+        if ref and rng.random() < 0.3:
+            victim = rng.choice(ref)
+            ref.remove(victim)
+            sl.remove(victim)
+        else:
+            ref.append(v)
+            sl.add(v)
+    ref.sort()
+    assert len(sl) == len(ref)
+    assert sl.slice(0, len(ref)) == ref
+    assert sl.slice(10, 25) == ref[10:25]
+
+def test_binary_values(backend):
+    async def scenario(backend):
+        blob = bytes(range(256))
+        await backend.set("b", blob, ex=100)
+        await backend.set("s", "text")
+        await backend.hset("h", {"a": 1})
+        assert await backend.mget_bytes("b", "s", "h", "missing") == [blob, b"text", None, None]
+        assert await backend.mget_bytes() == []
+    run(backend, scenario)
+
+def test_hyperloglogs(backend):
+    async def scenario(backend):
+        assert await backend.pfcount("hll") == 0
+        assert await backend.pfadd("hll", "a", "b", "c") == 1
+        assert await backend.pfadd("hll", "a", "b") == 0
+        assert await backend.pfcount("hll") == 3
+    run(backend, scenario)
@@ -0,0 +1,62 @@
+import gzip
+import json
+
+import pytest
+
+from app.export import gzip_stream, iter_ndjson, iter_rows
+from app.models import Account, Tweet
+from app.utils.settings import settings
+
+@pytest.fixture(autouse=True)
+def exported(db, monkeypatch):
+    monkeypatch.setattr(settings, "export_token", "ops-only")
+    user = Account(username="exporter", email="e@test.com", hashed_password="pw")
+    db.add(user)
+    db.commit()
+    db.add_all([Tweet(content=f"t{i}", user_id=user.id) for i in range(25)])
+    db.commit()
+    db.expunge_all()
+
+def test_rows_are_streamed_in_id_order(db):
+    rows = list(iter_rows(db, "tweets", batch_size=4))
+    assert [r["content"] for r in rows] == [f"t{i}" for i in range(25)]
+    assert not db.identity_map  # nothing left pinned in the session
+
+def test_since_id_resumes_export(db):
+    rows = list(iter_rows(db, "tweets", since_id=20))
+    assert [r["id"] for r in rows] == [21, 22, 23, 24, 25]
+
+def test_ndjson_chunks_and_gzip(db):
+    chunks = list(iter_ndjson(db, "tweets", batch_size=10))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert json.loads(lines[-1])["content"] == "t24"
+
+    zipped = b"".join(gzip_stream(iter_ndjson(db, "accounts")))
+    account = json.loads(gzip.decompress(zipped))
+    assert account["username"] == "exporter"
+    assert "hashed_password" not in account
+
+def test_export_needs_the_export_token(client, monkeypatch):
+    assert client.get("/api/export/accounts").status_code == 403
+    assert client.get("/api/export/accounts", headers={"X-Export-Token": "guess"}).status_code == 403
+    # a user login is not enough
+    assert client.get("/api/export/accounts", headers={"Authorization": "Bearer simplified_token"}).status_code == 403
+    monkeypatch.setattr(settings, "export_token", "")
+    assert client.get("/api/export/accounts", headers={"X-Export-Token": ""}).status_code == 403
+
+def test_http_export_resumes_from_since_id(client):
+    resp = client.get("/api/export/tweets", params={"since_id": 22}, headers={"X-Export-Token": "ops-only"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in resp.text.splitlines()] == [23, 24, 25]
+
+def test_http_gzip_export_is_a_gz_file(client):
+    resp = client.get("/api/export/tweets", params={"gzip": True}, headers={"X-Export-Token": "ops-only"})
+    assert resp.status_code == 200
+    # no Content-Encoding: the client must not decompress what it saves as .gz
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["content-type"] == "application/gzip"
+    assert resp.headers["content-disposition"].endswith('filename="tweets.ndjson.gz"')
+    lines = gzip.decompress(resp.content).decode().splitlines()
+    assert len(lines) == 25 and json.loads(lines[0])["content"] == "t0"
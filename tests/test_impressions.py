@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from fastapi import Request
+
+from app.cache_backends import HyperLogLog
+from app.impressions import ImpressionBatcher, impressions, viewer_id
+from app.models import Account, Tweet
+
+@pytest.mark.parametrize("n", [10, 1_000, 50_000])
+def test_hyperloglog_accuracy(n):
+    hll = HyperLogLog()
+    for i in range(n):
+        hll.add(f"viewer-{i}")
+        hll.add(f"viewer-{i // 2}")  # repeats don't count
+    assert abs(hll.count() - n) <= max(1, n * 0.03)
+
+def test_hyperloglog_is_exact_while_small():
+    hll = HyperLogLog()
+    assert hll.add("x") and not hll.add("x")
+    for i in range(HyperLogLog.SPARSE_LIMIT - 1):
+        hll.add(i)
+    assert hll.count() == HyperLogLog.SPARSE_LIMIT
+    # the register array takes over without losing what was seen
+    hll.add("one more")
+    assert abs(hll.count() - (HyperLogLog.SPARSE_LIMIT + 1)) <= 2
+
+def test_batcher_coalesces_and_flushes():
+    batcher = ImpressionBatcher()
+
+    async def scenario():
+        batcher.record("alice", [1, 2, 2])
+        batcher.record("bob", [1])
+        batcher.record("alice", [1])
+        assert await batcher.flush() == 2
+        assert await batcher.flush() == 0
+        assert await batcher.stats(1) == {"tweet_id": 1, "impressions": 3, "unique_viewers": 2}
+        assert await batcher.stats(2) == {"tweet_id": 2, "impressions": 1, "unique_viewers": 1}
+        await batcher.forget(1)
+        assert await batcher.stats(1) == {"tweet_id": 1, "impressions": 0, "unique_viewers": 0}
+    asyncio.run(scenario())
+
+def test_viewers_are_not_the_shared_token():
+    def request(host, agent):
+        return Request({"type": "http", "client": (host, 1234), "headers": [
+            (b"authorization", b"Bearer simplified_token"), (b"user-agent", agent.encode()),
+        ]})
+
+    # same token, told apart by address and user agent
+    alice, bob = viewer_id(request("10.0.0.1", "firefox")), viewer_id(request("10.0.0.2", "firefox"))
+    assert alice != bob
+    assert viewer_id(request("10.0.0.1", "curl")) != alice
+    assert viewer_id(request("10.0.0.1", "firefox")) == alice
+
+    batcher = ImpressionBatcher()
+
+    async def scenario():
+        batcher.record(alice, [7])
+        batcher.record(bob, [7])
+        batcher.record(alice, [7])
+        await batcher.flush()
+        assert await batcher.stats(7) == {"tweet_id": 7, "impressions": 3, "unique_viewers": 2}
+    asyncio.run(scenario())
+
+def test_timeline_views_show_up_in_stats(client, db):
+    user = Account(username="alice", email="a@test.com", hashed_password="pw")
+    db.add(user)
+    db.flush()
+    db.add_all([Tweet(id=i, content=f"t{i}", user_id=user.id) for i in (1, 2)])
+    db.commit()
+
+    # everyone logs in with the same token; browsers still tell them apart
+    for agent in ("firefox", "curl", "firefox"):
+        client.get("/api/tweets/batch", params={"ids": "1,1,3"},
+                   headers={"Authorization": "Bearer simplified_token", "User-Agent": agent})
+    asyncio.run(impressions.flush())
+
+    assert client.get("/api/tweets/1/stats").json() == {"tweet_id": 1, "impressions": 3, "unique_viewers": 2}
+    assert client.get("/api/tweets/3/stats").status_code == 404
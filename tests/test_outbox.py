@@ -0,0 +1,114 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import app.cache
+from app import crud, outbox
+from app.models import Account, OutboxEvent
+from app.outbox import OutboxRelay
+from app.schemas import TweetCreate
+
+@pytest.fixture(autouse=True)
+def writer(db):
+    db.add(Account(username="writer", email="w@test.com", hashed_password="pw"))
+    db.commit()
+
+def test_event_is_written_with_the_tweet_and_relayed(db):
+    tweet = crud.create_tweet(db, TweetCreate(content="hello #outbox"), account_id=1)
+    (event,) = db.query(OutboxEvent).all()
+    assert (event.kind, event.aggregate_id, event.processed_at) == ("tweet.created", tweet.id, None)
+
+    assert asyncio.run(OutboxRelay().run_once()) == 1
+    cached = asyncio.run(app.cache.get_tweet_cache(tweet.id))
+    assert cached["content"] == "hello #outbox"
+    db.expire_all()
+    assert db.get(OutboxEvent, event.id).processed_at is not None
+    # nothing left to do
+    assert asyncio.run(OutboxRelay().run_once()) == 0
+
+def test_delete_invalidates_cache(db):
+    tweet = crud.create_tweet(db, TweetCreate(content="short-lived"), account_id=1)
+    asyncio.run(OutboxRelay().run_once())
+    assert crud.delete_tweet(db, tweet.id)
+    asyncio.run(OutboxRelay().run_once())
+    assert asyncio.run(app.cache.get_tweet_cache(tweet.id)) is None
+
+def test_failures_are_retried_with_backoff(db, monkeypatch):
+    calls = []
+
+    async def flaky(event, tweet):
+        calls.append(event.id)
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(outbox.HANDLERS, "tweet.created", [flaky])
+    crud.create_tweet(db, TweetCreate(content="x"), account_id=1)
+    relay = OutboxRelay(max_attempts=2)
+    assert asyncio.run(relay.run_once()) == 1
+    # backed off: not picked up again immediately
+    assert asyncio.run(relay.run_once()) == 0
+    db.expire_all()
+    event = db.query(OutboxEvent).one()
+    assert event.attempts == 1 and "boom" in event.last_error and event.processed_at is None
+    assert calls == [event.id]
+
+def test_redelivered_event_is_applied_once(db, monkeypatch):
+    calls = []
+
+    async def count(event, tweet):
+        calls.append(event.id)
+
+    monkeypatch.setitem(outbox.HANDLERS, "tweet.created", [count])
+    crud.create_tweet(db, TweetCreate(content="x"), account_id=1)
+    asyncio.run(OutboxRelay().run_once())
+    # simulate a crash after applying but before marking processed
+    db.query(OutboxEvent).update({OutboxEvent.processed_at: None, OutboxEvent.available_at: OutboxEvent.created_at})
+    db.commit()
+    assert asyncio.run(OutboxRelay().run_once()) == 1
+    assert len(calls) == 1
+
+def test_retry_after_partial_failure_skips_completed_handlers(db, monkeypatch):
+    calls = []
+
+    async def count_hashtags(event, tweet):
+        calls.append("count")
+
+    async def fan_out(event, tweet):
+        calls.append("fan_out")
+        if calls.count("fan_out") == 1:
+            raise RuntimeError("publish failed")
+
+    monkeypatch.setitem(outbox.HANDLERS, "tweet.created", [count_hashtags, fan_out])
+    crud.create_tweet(db, TweetCreate(content="#once"), account_id=1)
+    asyncio.run(OutboxRelay().run_once())
+    # make the retry due now
+    db.query(OutboxEvent).update({OutboxEvent.available_at: OutboxEvent.created_at})
+    db.commit()
+    assert asyncio.run(OutboxRelay().run_once()) == 1
+    assert calls == ["count", "fan_out", "fan_out"]
+    db.expire_all()
+    assert db.query(OutboxEvent).one().processed_at is not None
+
+def test_old_dead_letters_are_purged(db, monkeypatch):
+    async def broken(event, tweet):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(outbox.HANDLERS, "tweet.created", [broken])
+    crud.create_tweet(db, TweetCreate(content="x"), account_id=1)
+    relay = OutboxRelay(max_attempts=1, dead_letter_days=1)
+    asyncio.run(relay.run_once())
+    db.expire_all()
+    event = db.query(OutboxEvent).one()
+    dead_id = event.id
+    # gave up, but kept for inspection while recent
+    assert event.attempts == 1 and event.processed_at is None
+
+    db.query(OutboxEvent).update({OutboxEvent.created_at: datetime.now(timezone.utc) - timedelta(days=2)})
+    db.commit()
+    # any later pass (here: another event's) purges it
+    monkeypatch.setitem(outbox.HANDLERS, "tweet.created", [])
+    crud.create_tweet(db, TweetCreate(content="y"), account_id=1)
+    asyncio.run(relay.run_once())
+    db.expunge_all()
+    assert db.get(OutboxEvent, dead_id) is None
+    assert db.query(OutboxEvent).count() == 1
@@ -0,0 +1,109 @@
+import pytest
+from sqlalchemy import event, insert, inspect
+
+from app import account_stats, crud
+from app.models import Account, AccountStats, Like, Tweet
+from app.schemas import TweetCreate
+
+@pytest.fixture(autouse=True)
+def two_accounts(db):
+    db.add_all([
+        Account(username="alice", email="a@test.com", hashed_password="pw"),
+        Account(username="bob", email="b@test.com", hashed_password="pw"),
+    ])
+    db.commit()
+
+def _stats(db, account_id):
+    db.expire_all()
+    return account_stats.get_stats(db, account_id)
+
+def test_counters_follow_writes(db):
+    first = crud.create_tweet(db, TweetCreate(content="one"), account_id=1)
+    crud.create_tweet(db, TweetCreate(content="two"), account_id=1)
+    db.add_all([Like(tweet_id=first.id, user_id=2), Like(tweet_id=first.id, user_id=1)])
+    db.commit()
+    assert _stats(db, 1) == {"tweet_count": 2, "likes_received": 2, "followers": 0}
+    assert _stats(db, 2) == {"tweet_count": 0, "likes_received": 0, "followers": 0}
+
+    # deleting the tweet takes its likes with it
+    crud.delete_tweet(db, first.id)
+    assert _stats(db, 1) == {"tweet_count": 1, "likes_received": 0, "followers": 0}
+
+def test_accounts_without_a_row_are_seeded_once(db):
+    crud.create_tweet(db, TweetCreate(content="old"), account_id=2)
+    db.query(AccountStats).filter(AccountStats.account_id == 2).delete()
+    db.commit()
+    # read path counts on the fly, write path seeds the row
+    assert _stats(db, 2)["tweet_count"] == 1
+    crud.create_tweet(db, TweetCreate(content="new"), account_id=2)
+    assert db.get(AccountStats, 2).tweet_count == 2
+
+def test_concurrent_first_writes_share_the_seeded_row(db, monkeypatch):
+    crud.create_tweet(db, TweetCreate(content="old"), account_id=2)
+    db.query(AccountStats).filter(AccountStats.account_id == 2).delete()
+    db.commit()
+    seed = account_stats.count_from_scratch
+
+    def another_writer_seeds_first(conn, account_ids=None):
+        # a concurrent first write inserts the row after our UPDATE missed it
+        counts = seed(conn, account_ids)
+        conn.execute(insert(AccountStats).values(account_id=2, tweet_count=1))
+        return counts
+    monkeypatch.setattr(account_stats, "count_from_scratch", another_writer_seeds_first)
+
+    crud.create_tweet(db, TweetCreate(content="new"), account_id=2)
+    assert db.get(AccountStats, 2).tweet_count == 2
+
+def test_reconcile_repairs_drift(db):
+    crud.create_tweet(db, TweetCreate(content="x"), account_id=1)
+    # bulk deletes bypass the ORM events
+    db.query(Tweet).delete(synchronize_session=False)
+    db.commit()
+    assert _stats(db, 1)["tweet_count"] == 1
+    assert account_stats.reconcile(db) == 1
+    assert _stats(db, 1)["tweet_count"] == 0
+    assert account_stats.reconcile(db) == 0
+
+def test_profile_pages_with_a_cursor(client, db):
+    # same-second server timestamps: the id breaks the tie
+    for i in range(5):
+        crud.create_tweet(db, TweetCreate(content=f"t{i}"), account_id=1)
+    crud.create_tweet(db, TweetCreate(content="not alice"), account_id=2)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        body = client.get("/api/accounts/alice/tweets", params=params).json()
+        seen += [t["content"] for t in body["tweets"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["t4", "t3", "t2", "t1", "t0"]
+    assert body["profile"]["username"] == "alice" and body["profile"]["tweet_count"] == 5
+
+def test_profile_errors(client):
+    assert client.get("/api/accounts/nobody/tweets").status_code == 404
+    assert client.get("/api/accounts/alice/tweets", params={"cursor": "%%%"}).status_code == 400
+
+def test_profile_query_uses_the_author_index(db):
+    assert "ix_tweets_user_created_id" in {i["name"] for i in inspect(db.get_bind()).get_indexes("tweets")}
+    first = crud.create_tweet(db, TweetCreate(content="one"), account_id=1)
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+    event.listen(db.get_bind(), "before_cursor_execute", capture)
+    try:
+        crud.get_account_tweets(db, 1)
+        crud.get_account_tweets(db, 1, before=(first.created_at, first.id))
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", capture)
+
+    assert len(statements) == 2
+    for statement, parameters in statements:
+        rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        plan = " ".join(str(row) for row in rows)
+        assert "ix_tweets_user_created_id" in plan
+        # the index order is the page order: no sort step
+        assert "TEMP B-TREE" not in plan
@@ -0,0 +1,95 @@
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+
+from app.models import Account, Tweet
+from app.query_stats import (
+    REQUEST_THREAD_NAME, StackSampler, assert_max_queries, profiling_requested, track_queries,
+)
+from app.routers.tweets import _newest_tweets
+from app.utils.settings import settings
+
+@pytest.fixture(autouse=True)
+def nine_tweets(db):
+    for name in ["a", "b", "c"]:
+        user = Account(username=name, email=f"{name}@test.com", hashed_password="pw")
+        db.add(user)
+        db.flush()
+        db.add_all([Tweet(content=f"{name}{i}", user_id=user.id) for i in range(3)])
+    db.commit()
+
+def test_track_queries_counts_and_flags_repeats(db):
+    with track_queries() as stats:
+        for i in range(1, 6):
+            db.execute(text("SELECT * FROM tweets WHERE id = :id"), {"id": i})
+        db.execute(text("SELECT count(*) FROM accounts"))
+    assert stats.count == 6
+    assert stats.total_time > 0
+    ((statement, n),) = stats.repeated(5)
+    assert n == 5 and "FROM tweets" in statement
+
+def test_list_tweets_has_no_n_plus_one(db):
+    with assert_max_queries(1):
+        tweets = _newest_tweets(db, 0, 100)
+    assert len(tweets) == 9
+    assert {t["username"] for t in tweets} == {"a", "b", "c"}
+
+def test_assert_max_queries_fails_over_budget(db):
+    with pytest.raises(AssertionError, match="at most 1 queries, got 2"):
+        with assert_max_queries(1):
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+
+def test_middleware_sets_server_timing(client):
+    resp = client.get("/api/tweets/")
+    assert len(resp.json()) == 9
+    timing = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', resp.headers["server-timing"])
+    assert timing and int(timing.group(1)) >= 1
+
+def test_stack_sampler_emits_folded_stacks():
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    sum(i * i for i in range(200_000))
+    folded = sampler.stop()
+    line = folded.splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert ";" in stack and int(count) >= 1
+
+def test_request_profiles_skip_background_threads():
+    stop = threading.Event()
+
+    def request_work():
+        while not stop.is_set():
+            sum(i for i in range(1000))
+
+    def background_work():
+        while not stop.is_set():
+            sum(i for i in range(1000))
+
+    threads = [
+        threading.Thread(target=request_work, name=f"{REQUEST_THREAD_NAME} 1", daemon=True),
+        threading.Thread(target=background_work, name="asyncio_0", daemon=True),
+    ]
+    for t in threads:
+        t.start()
+    sampler = StackSampler(interval=0.001, requests_only=True)
+    sampler.start()
+    time.sleep(0.05)
+    folded = sampler.stop()
+    stop.set()
+    assert "request_work" in folded
+    assert "background_work" not in folded
+
+def test_profiling_token_check(monkeypatch):
+    def asks(value):
+        return profiling_requested(SimpleNamespace(headers={"x-profile": value} if value is not None else {}))
+
+    monkeypatch.setattr(settings, "profile_token", "")
+    assert not asks("")
+    monkeypatch.setattr(settings, "profile_token", "s3cret")
+    assert asks("s3cret")
+    assert not asks("s3cre") and not asks(None) and not asks("sécret")
@@ -0,0 +1,77 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import app.cache
+from app.rate_limit import RateLimit, RateLimiter
+
+def test_local_bucket_refills():
+    limiter = RateLimiter(mode="local")
+    assert asyncio.run(limiter.hit("k", capacity=2, rate=1.0)) == 0
+    assert asyncio.run(limiter.hit("k", capacity=2, rate=1.0)) == 0
+    retry = asyncio.run(limiter.hit("k", capacity=2, rate=1.0))
+    assert 0 < retry <= 1.0
+    # other keys are independent
+    assert asyncio.run(limiter.hit("other", capacity=2, rate=1.0)) == 0
+
+def test_dependency_returns_429_with_retry_after():
+    app = FastAPI()
+
+    @app.post("/limited", dependencies=[Depends(RateLimit("test_scope", limit=3, per=60))])
+    def limited():
+        return {"ok": True}
+
+    client = TestClient(app)
+    codes = [client.post("/limited").status_code for _ in range(4)]
+    assert codes == [200, 200, 200, 429]
+    resp = client.post("/limited")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+@pytest.fixture
+def redis_url():
+    """
+    TEST_REDIS_URL points at a disposable database (it is flushed).
+    """
+    url = os.getenv("TEST_REDIS_URL")
+    if not url:
+        pytest.skip("TEST_REDIS_URL not set")
+    return url
+
+def _with_redis(url, monkeypatch, scenario):
+    import redis.asyncio as aioredis
+
+    async def run():
+        client = aioredis.from_url(url, decode_responses=True)
+        await client.flushdb()
+        monkeypatch.setattr(app.cache, "redis_client", client)
+        try:
+            await scenario()
+        finally:
+            await client.aclose()
+    asyncio.run(run())
+
+def test_redis_mode_shares_the_bucket(redis_url, monkeypatch):
+    async def scenario():
+        a, b = RateLimiter(mode="redis"), RateLimiter(mode="redis")
+        assert await a.hit("k", capacity=2, rate=0.1) == 0
+        assert await b.hit("k", capacity=2, rate=0.1) == 0
+        retry = await a.hit("k", capacity=2, rate=0.1)
+        assert 0 < retry <= 10
+    _with_redis(redis_url, monkeypatch, scenario)
+
+def test_local_mode_sync_converges_on_the_shared_balance(redis_url, monkeypatch):
+    async def scenario():
+        a = RateLimiter(mode="local", sync_interval=3600)
+        b = RateLimiter(mode="local", sync_interval=3600)
+        for _ in range(3):
+            assert await a.hit("k", capacity=4, rate=0.01) == 0
+        await a.sync()
+        # b hasn't seen a's usage yet; its first sync adopts the shared balance
+        assert await b.hit("k", capacity=4, rate=0.01) == 0
+        await b.sync()
+        assert await b.hit("k", capacity=4, rate=0.01) > 0
+    _with_redis(redis_url, monkeypatch, scenario)
@@ -0,0 +1,105 @@
+import anyio
+import pytest
+from sqlalchemy import create_engine, text
+
+import app.cache as cache
+import app.database as database
+from app.database import Base, ReadSessionLocal, ReplicaPool
+from app.models import Account
+
+@pytest.fixture
+def sqlite_replicas(tmp_path, monkeypatch):
+    # one primary + two "replicas", each a separate SQLite file whose only
+    # account tells us which database answered
+    engines = []
+    for name in ["primary", "replica1", "replica2"]:
+        eng = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=eng)
+        with eng.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO accounts (username, email, hashed_password) "
+                f"VALUES ('{name}', '{name}@test.com', 'pw')"
+            ))
+        engines.append(eng)
+    primary, *reps = engines
+    pool = ReplicaPool(reps, retry_seconds=60)
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setitem(database.SessionLocal.kw, "bind", primary)
+    monkeypatch.setattr(database, "replicas", pool)
+    yield pool
+    for eng in engines:
+        eng.dispose()
+
+def _who(db):
+    return db.query(Account.username).scalar()
+
+def test_reads_round_robin_and_stick_per_session(sqlite_replicas):
+    seen = []
+    for _ in range(4):
+        db = ReadSessionLocal()
+        seen.append(_who(db))
+        assert _who(db) == seen[-1]  # same replica for the whole session
+        db.close()
+    assert seen == ["replica1", "replica2", "replica1", "replica2"]
+
+def test_unhealthy_replica_is_skipped(sqlite_replicas):
+    sqlite_replicas.mark_down(sqlite_replicas.engines[0])
+    assert {_who(ReadSessionLocal()) for _ in range(3)} == {"replica2"}
+    sqlite_replicas.mark_down(sqlite_replicas.engines[1])
+    assert _who(ReadSessionLocal()) == "primary"
+
+def test_flushes_go_to_primary(sqlite_replicas):
+    db = ReadSessionLocal()
+    db.add(Account(username="new", email="new@test.com", hashed_password="pw"))
+    db.flush()
+    db.commit()
+    with database.engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM accounts")).scalar() == 2
+
+def test_writers_read_their_writes(sqlite_replicas):
+    class _Req:
+        client = type("C", (), {"host": "1.2.3.4"})()
+        headers = {}
+
+    writes = database.get_db(_Req())
+    db = next(writes)
+    db.add(Account(username="w", email="w@test.com", hashed_password="pw"))
+    db.commit()
+    writes.close()
+
+    reads = database.get_read_db(_Req())
+    assert not isinstance(next(reads), database.ReplicaSession)
+    reads.close()
+
+def test_stickiness_is_shared_between_workers(sqlite_replicas, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(cache, "redis_client", fakeredis.FakeAsyncRedis())
+    monkeypatch.setattr(database, "_recent_writers", {})
+
+    class _Req:
+        client = type("C", (), {"host": "1.2.3.4"})()
+        headers = {}
+
+    def write():
+        writes = database.get_db(_Req())
+        db = next(writes)
+        db.add(Account(username="w", email="w@test.com", hashed_password="pw"))
+        db.commit()
+        writes.close()
+
+    def reads_from_replica():
+        reads = database.get_read_db(_Req())
+        replica = isinstance(next(reads), database.ReplicaSession)
+        reads.close()
+        return replica
+
+    async def scenario():
+        # dependencies run in the threadpool, as under FastAPI
+        await anyio.to_thread.run_sync(write)
+        # the next request lands on a worker that didn't see the write
+        database._recent_writers.clear()
+        assert not await anyio.to_thread.run_sync(reads_from_replica)
+        # once the marker expires, reads go back to the replicas
+        await cache.redis_client.flushall()
+        assert await anyio.to_thread.run_sync(reads_from_replica)
+    anyio.run(scenario)
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+import app.cache as cache
+from app.scheduler import Job, LeaderElection, Scheduler
+
+class Follower(LeaderElection):
+    async def refresh(self):
+        return False
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", None)
+
+def run_for(scheduler, seconds):
+    async def scenario():
+        scheduler.start()
+        await asyncio.sleep(seconds)
+        await scheduler.stop()
+    asyncio.run(scenario())
+
+def test_jitter_stays_within_bounds():
+    job = Job("j", lambda: None, interval=10, jitter=0.2)
+    delays = [job.next_delay() for _ in range(1000)]
+    assert 8 <= min(delays) and max(delays) <= 12 and len(set(delays)) > 1
+
+def test_jobs_run_and_record_metrics():
+    calls = []
+
+    async def tick():
+        calls.append("async")
+
+    def blocking():
+        time.sleep(0.01)
+        calls.append("sync")
+
+    def broken():
+        raise RuntimeError("boom")
+
+    scheduler = Scheduler(LeaderElection(lease_seconds=0.3))
+    scheduler.add("tick", tick, 0.05)
+    scheduler.add("blocking", blocking, 0.05)
+    scheduler.add("broken", broken, 0.05)
+    with pytest.raises(ValueError):
+        scheduler.add("tick", tick, 1)
+    run_for(scheduler, 0.5)
+
+    assert "async" in calls and "sync" in calls
+    metrics = scheduler.metrics()["jobs"]
+    assert metrics["blocking"]["runs"] >= 2 and metrics["blocking"]["max_seconds"] >= 0.01
+    assert metrics["broken"]["failures"] == metrics["broken"]["runs"] > 0
+    assert "boom" in metrics["broken"]["last_error"]
+
+def test_followers_only_run_per_worker_jobs():
+    ran = []
+
+    async def cluster():
+        ran.append("cluster")
+
+    async def local():
+        ran.append("local")
+
+    scheduler = Scheduler(Follower(lease_seconds=0.3))
+    scheduler.add("cluster", cluster, 0.05)
+    scheduler.add("local", local, 0.05, leader_only=False)
+    run_for(scheduler, 0.3)
+    assert "local" in ran and "cluster" not in ran
+    assert scheduler.jobs["cluster"].skipped > 0
+
+def test_stop_drains_then_runs_shutdown_jobs():
+    events = []
+
+    async def slow():
+        events.append("start")
+        await asyncio.sleep(0.2)
+        events.append("end")
+
+    async def flush():
+        events.append("flush")
+
+    scheduler = Scheduler(LeaderElection(), drain_seconds=5)
+    scheduler.add("slow", slow, 0.01, jitter=0)
+    scheduler.add("flush", flush, 3600, run_on_shutdown=True)
+
+    async def scenario():
+        scheduler.start()
+        while not scheduler.jobs["slow"].running:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+    asyncio.run(scenario())
+    # the run in progress finished, nothing new started, flush ran last
+    assert events == ["start", "end", "flush"]
+
+def test_drain_timeout_cancels_stuck_jobs():
+    async def stuck():
+        await asyncio.sleep(60)
+
+    scheduler = Scheduler(LeaderElection(), drain_seconds=0.1)
+    scheduler.add("stuck", stuck, 0.01)
+    t0 = time.monotonic()
+    run_for(scheduler, 0.1)
+    assert time.monotonic() - t0 < 2
+
+@pytest.mark.skipif(not os.getenv("TEST_REDIS_URL"), reason="needs TEST_REDIS_URL")
+def test_one_leader_per_cluster(monkeypatch):
+    import redis.asyncio as aioredis
+
+    async def scenario():
+        client = aioredis.from_url(os.environ["TEST_REDIS_URL"], decode_responses=True)
+        monkeypatch.setattr(cache, "redis_client", client)
+        await client.delete("scheduler:test")
+        a, b = LeaderElection("scheduler:test", 5), LeaderElection("scheduler:test", 5)
+        assert await a.refresh() and not await b.refresh()
+        assert await a.refresh()  # renewal keeps it
+        await a.release()
+        assert await b.refresh() and b.is_leader and not a.is_leader
+        await client.close()
+    asyncio.run(scenario())
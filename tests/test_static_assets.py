@@ -0,0 +1,76 @@
+import gzip
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.models import Account, Tweet
+from app.static_assets import StaticAssets, parse_accept_encoding
+from app.utils.settings import settings
+
+def _assets(tmp_path):
+    src = tmp_path / "static"
+    src.mkdir()
+    (src / "app.js").write_text("console.log('hello');\n" * 50)
+    (src / "index.html").write_text('<script src="/static/app.js"></script>')
+    return StaticAssets(str(src), str(tmp_path / "build"))
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert parse_accept_encoding("br;q=0, gzip;q=0.5") == {"gzip"}
+    assert parse_accept_encoding("") == set()
+
+def test_build_fingerprints_and_rewrites_html(tmp_path):
+    assets = _assets(tmp_path)
+    manifest = assets.build()
+    js = manifest["app.js"]
+    assert js.startswith("app.") and js.endswith(".js") and js != "app.js"
+    html = (tmp_path / "build" / manifest["index.html"]).read_text()
+    assert f"/static/{js}" in html
+    gz = (tmp_path / "build" / (js + ".gz")).read_bytes()
+    assert gzip.decompress(gz) == (tmp_path / "static" / "app.js").read_bytes()
+    # unchanged sources keep their fingerprint across builds
+    assert StaticAssets(assets.source_dir, assets.build_dir).build() == manifest
+
+def test_response_headers(tmp_path):
+    assets = _assets(tmp_path)
+    app = FastAPI()
+
+    @app.get("/static/{path:path}")
+    def serve(path: str, request: Request):
+        return assets.response(path, request.headers.get("accept-encoding", ""))
+
+    client = TestClient(app)
+    js = assets.build()["app.js"]
+
+    resp = client.get(f"/static/{js}", headers={"accept-encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "immutable" in resp.headers["cache-control"]
+    assert resp.text.startswith("console.log")
+
+    resp = client.get("/static/app.js", headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["cache-control"] == "no-cache"
+
+    assert client.get("/static/missing.js").status_code == 404
+
+def test_api_responses_are_gzipped_but_assets_and_exports_are_not(client, db, monkeypatch):
+    user = Account(username="gz", email="gz@test.com", hashed_password="pw")
+    db.add(user)
+    db.flush()
+    db.add_all([Tweet(content=f"tweet number {i} " * 5, user_id=user.id) for i in range(60)])
+    db.commit()
+    monkeypatch.setattr(settings, "export_token", "ops")
+    gz = {"Accept-Encoding": "gzip"}
+
+    api = client.get("/api/tweets/", headers=gz)
+    assert len(api.content) > 1000
+    assert api.headers.get("content-encoding") == "gzip"
+
+    static = client.get("/static/app.js", headers=gz)
+    assert static.status_code == 200
+    # served from the precompressed variant; gzipping it again would leave
+    # a gzip stream in the body after httpx decodes one layer
+    assert static.content == (Path(settings.static_dir) / "app.js").read_bytes()
+    export = client.get("/api/export/tweets", headers={**gz, "X-Export-Token": "ops"})
+    assert export.status_code == 200 and "content-encoding" not in export.headers
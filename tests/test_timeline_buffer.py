@@ -0,0 +1,80 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from app import crud
+from app.models import Account
+from app.outbox import OutboxRelay
+from app.schemas import TweetCreate
+from app.timeline_buffer import TimelineBuffer
+
+def _tweet(i):
+    return {
+        "id": i,
+        "content": f"tweet {i}",
+        "created_at": datetime(2025, 1, 1, tzinfo=timezone.utc),
+        "username": "u",
+        "like_count": 0,
+        "liked_by_user": False,
+    }
+
+def _ids(page):
+    ids, body = page
+    assert [t["id"] for t in json.loads(body)] == ids
+    return ids
+
+def test_not_ready_until_primed():
+    buf = TimelineBuffer(capacity=5)
+    assert buf.page(0, 3) is None
+    buf.prime([_tweet(i) for i in (9, 8, 7, 6, 5, 4)])
+    assert _ids(buf.page(0, 3)) == [9, 8, 7]
+    # deeper than the buffer falls through
+    assert buf.page(3, 3) is None
+
+def test_push_evicts_oldest():
+    buf = TimelineBuffer(capacity=3)
+    buf.prime([_tweet(2), _tweet(1)])
+    assert buf.complete and _ids(buf.page(0, 10)) == [2, 1]
+    buf.add(_tweet(3))
+    buf.add(_tweet(4))
+    assert not buf.complete
+    assert _ids(buf.page(0, 3)) == [4, 3, 2]
+    assert buf.page(0, 4) is None
+
+def test_events_from_other_workers():
+    a, b = TimelineBuffer(capacity=3), TimelineBuffer(capacity=3)
+    a.prime([_tweet(1)])
+    b.prime([_tweet(1)])
+    event = a.add(_tweet(2))
+    a.apply(event)  # own events are ignored
+    b.apply(event)
+    assert _ids(a.page(0, 3)) == _ids(b.page(0, 3)) == [2, 1]
+    b.apply(json.dumps({"op": "invalidate", "origin": "elsewhere"}))
+    assert b.page(0, 1) is None
+
+def test_prime_keeps_tweets_pushed_meanwhile():
+    buf = TimelineBuffer(capacity=5)
+    buf.push(10, b'{"id":10}')
+    buf.prime([_tweet(9), _tweet(8)])
+    assert _ids(buf.page(0, 3)) == [10, 9, 8]
+
+def test_invalidate_drops_the_deleted_tweet():
+    buf = TimelineBuffer(capacity=5)
+    buf.prime([_tweet(3), _tweet(2), _tweet(1)])
+    buf.apply(json.dumps({"op": "invalidate", "id": 3, "origin": "elsewhere"}))
+    assert buf.page(0, 1) is None
+    # the database no longer has 3; it must not survive as "pushed meanwhile"
+    buf.prime([_tweet(2), _tweet(1)])
+    assert _ids(buf.page(0, 3)) == [2, 1]
+
+def test_deleted_tweet_leaves_the_timeline(client, db):
+    db.add(Account(username="writer", email="w@test.com", hashed_password="pw"))
+    db.commit()
+    for i in range(3):
+        crud.create_tweet(db, TweetCreate(content=f"tweet {i}"), account_id=1)
+    asyncio.run(OutboxRelay().run_once())
+    assert [t["id"] for t in client.get("/api/tweets/").json()] == [3, 2, 1]
+
+    crud.delete_tweet(db, 3)
+    asyncio.run(OutboxRelay().run_once())
+    assert [t["id"] for t in client.get("/api/tweets/").json()] == [2, 1]
@@ -0,0 +1,48 @@
+import asyncio
+import random
+import time
+
+from app.trending import SpaceSaving, TrendingTracker, extract_hashtags
+
+def test_extract_hashtags():
+    assert extract_hashtags("Hello #Python and #python, not a#tag #fast_api") == {"python", "fast_api"}
+    assert extract_hashtags("no tags here") == set()
+
+def test_space_saving_keeps_heavy_hitters():
+    sketch = SpaceSaving(capacity=3)
+    for _ in range(10):
+        sketch.add("hot")
+    for tag in ["a", "b", "c", "d", "e"]:
+        sketch.add(tag)
+    assert len(sketch.counts) == 3
+    assert sketch.counts["hot"] == 10
+
+def test_space_saving_evicts_the_minimum():
+    sketch = SpaceSaving(capacity=50)
+    rng = random.Random(7)
+    stream = [f"t{int(rng.paretovariate(1.2))}" for _ in range(5000)]
+    for tag in stream:
+        floor = min(sketch.counts.values()) if len(sketch.counts) == 50 else 0
+        new = tag not in sketch.counts
+        sketch.add(tag)
+        if new:
+            assert sketch.counts[tag] == floor + 1
+    # every arrival is counted exactly once, and the heap stays bounded
+    assert sum(sketch.counts.values()) == len(stream)
+    assert len(sketch._heap) <= 2 * sketch.capacity
+    for tag in ("t1", "t2"):
+        assert sketch.counts[tag] >= stream.count(tag)
+
+def test_top_applies_window_and_decay():
+    tracker = TrendingTracker(bucket_seconds=60, refresh_seconds=0)
+    now = time.time()
+    tracker.record("#old #old2", ts=now - 2 * 3600)   # outside 1h, inside 24h
+    tracker.record("#recent", ts=now)
+    tracker.record("#recent #older", ts=now)
+    tracker.record("#older", ts=now - 50 * 60)
+
+    hour = asyncio.run(tracker.top("1h"))
+    assert [t["tag"] for t in hour] == ["recent", "older"]
+
+    day = {t["tag"] for t in asyncio.run(tracker.top("24h"))}
+    assert day == {"recent", "older", "old", "old2"}
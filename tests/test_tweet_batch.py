@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+import app.cache as cache
+from app.models import Account, Tweet
+from app.routers import tweets
+from app.utils.settings import settings
+
+@pytest.fixture(autouse=True)
+def three_tweets(db):
+    user = Account(username="alice", email="a@test.com", hashed_password="pw")
+    db.add(user)
+    db.flush()
+    db.add_all([Tweet(id=i, content=f"t{i}", user_id=user.id) for i in (1, 2, 3)])
+    db.commit()
+
+def test_results_follow_request_order(client):
+    resp = client.get("/api/tweets/batch", params={"ids": "3,99,1,3"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [(item["id"], item["found"]) for item in body] == [(3, True), (99, False), (1, True), (3, True)]
+    assert body[0]["tweet"]["content"] == "t3" and body[0]["tweet"]["username"] == "alice"
+    assert body[1]["tweet"] is None
+
+def test_misses_are_back_filled(client, db):
+    client.get("/api/tweets/batch", params={"ids": "1,2"})
+    # served from the cache once the rows are gone
+    db.query(Tweet).delete()
+    db.commit()
+    body = client.get("/api/tweets/batch", params={"ids": "1,2,3"}).json()
+    assert [item["found"] for item in body] == [True, True, False]
+    # fetched by id, not new: they stay out of the recent index
+    assert asyncio.run(cache.backend.zcard("tweets:recent")) == 0
+
+def test_recent_index_is_trimmed(db, monkeypatch):
+    monkeypatch.setattr(settings, "recent_tweets_cache_size", 2)
+
+    async def scenario():
+        for tweet_id in (1, 2, 3):
+            await cache.set_tweet_cache(db.get(Tweet, tweet_id))
+        assert await cache.backend.zcard("tweets:recent") == 2
+        # every tweet shares a timestamp here; the largest key wins the tie
+        assert await cache.backend.zrevrange("tweets:recent", 0, -1) == ["tweet:3", "tweet:2"]
+    asyncio.run(scenario())
+
+def test_legacy_entries_are_upgraded(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "tweet_cache_format", "hash")
+    asyncio.run(cache.set_tweet_cache(db.get(Tweet, 2)))
+    monkeypatch.setattr(settings, "tweet_cache_format", "binary")
+    body = client.get("/api/tweets/batch", params={"ids": "2"}).json()
+    assert body[0]["tweet"]["username"] == "alice"
+    assert asyncio.run(cache.get_tweet_cache(2))["username"] == "alice"
+
+@pytest.mark.parametrize("ids", ["", "1,x", ",".join(str(i) for i in range(tweets.MAX_BATCH_IDS + 1))])
+def test_rejects_bad_or_oversized_requests(client, ids):
+    assert client.get("/api/tweets/batch", params={"ids": ids}).status_code == 422
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import app.cache as cache
+from app import tweet_codec
+from app.cache_backends import MemoryBackend
+from app.utils.settings import settings
+
+def _tweet(id=7, content="héllo #x", username="alice", **kw):
+    fields = dict(id=id, content=content, user_id=3, username=username,
+                  created_at=datetime(2025, 5, 1, 12, 30, 15, 123456))
+    fields.update(kw)
+    return SimpleNamespace(**fields)
+
+@pytest.fixture
+def backend(monkeypatch):
+    b = MemoryBackend()
+    monkeypatch.setattr(cache, "backend", b)
+    return b
+
+def test_tweet_round_trip():
+    blob = tweet_codec.encode_tweet(_tweet())
+    assert blob[0] == tweet_codec.TWEET_V1
+    assert tweet_codec.decode_tweet(blob) == {
+        "id": 7, "content": "héllo #x", "user_id": 3, "username": "alice",
+        "created_at": datetime(2025, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+    }
+
+def test_aware_timestamps_are_stored_as_utc():
+    aware = datetime(2025, 5, 1, 14, 30, tzinfo=timezone(timedelta(hours=2)))
+    decoded = tweet_codec.decode_tweet(tweet_codec.encode_tweet(_tweet(created_at=aware, username=None)))
+    assert decoded["created_at"] == datetime(2025, 5, 1, 12, 30, tzinfo=timezone.utc)
+    assert decoded["created_at"].utcoffset() == timedelta(0)
+    assert decoded["username"] is None
+
+def test_unknown_layout_reads_as_miss():
+    blob = tweet_codec.encode_tweet(_tweet())
+    assert tweet_codec.decode_tweet(b"\x7f" + blob[1:]) is None
+    assert tweet_codec.decode_tweet(None) is None
+    assert tweet_codec.decode_page(blob) is None
+
+def test_page_round_trip():
+    entries = [(3, b'{"id":3}'), (2, b""), (1, "ü".encode())]
+    assert tweet_codec.decode_page(tweet_codec.encode_page(entries)) == entries
+    assert tweet_codec.decode_page(tweet_codec.encode_page([])) == []
+
+def test_reader_accepts_legacy_hashes(backend, monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(settings, "tweet_cache_format", "hash")
+        await cache.set_tweet_cache(_tweet(id=1))
+        assert await backend.hgetall("tweet:1")
+        legacy = await cache.get_tweet_cache(1)
+        assert legacy["content"] == "héllo #x" and legacy["user_id"] == 3
+        # both layouts hand back the same aware UTC timestamp
+        assert legacy["created_at"] == datetime(2025, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+        # switching the writers replaces the hash with a blob
+        monkeypatch.setattr(settings, "tweet_cache_format", "binary")
+        await cache.set_tweet_cache(_tweet(id=1, content="edited"))
+        await cache.set_tweet_cache(_tweet(id=2, created_at=datetime(2025, 5, 2)))
+        assert not await backend.exists("tweet:1")
+        assert (await cache.get_tweet_cache(1))["content"] == "edited"
+        assert set(await cache.get_tweets_cache([1, 2, 99])) == {1, 2}
+        assert [t["id"] for t in await cache.get_recent_tweets()] == [2, 1]
+
+        await cache.invalidate_tweet_cache(1)
+        assert await cache.get_tweet_cache(1) is None
+    asyncio.run(scenario())
+
+def test_timeline_head(backend):
+    async def scenario():
+        assert await cache.get_timeline_head() is None
+        await cache.set_timeline_head([(2, b"b"), (1, b"a")])
+        assert await cache.get_timeline_head() == [(2, b"b"), (1, b"a")]
+        await cache.invalidate_timeline_head()
+        assert await cache.get_timeline_head() is None
+    asyncio.run(scenario())